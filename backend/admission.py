@@ -0,0 +1,169 @@
+"""
+Admission control for CPU-heavy tool endpoints
+
+Tool work (PDF parsing, regex extraction, pandas) runs on a bounded thread pool
+instead of the event loop, so /files and other cheap endpoints stay responsive.
+At most `max_concurrent` tool jobs run at once per worker and at most
+`max_queue` wait for a slot; anything beyond that is rejected with 429, and a
+job that waits longer than `queue_timeout` seconds gets 503. Both carry a
+Retry-After header.
+Background work (indexing after upload) runs on its own small pool, so it
+never holds up an admitted request.
+"""
+
+import asyncio
+import functools
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException
+
+
+class AdmissionController:
+    """
+    Concurrency cap + bounded wait queue in front of a thread pool
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 8, queue_timeout: float = 30.0,
+                 background_workers: int = 1):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="tool-worker")
+        self.background_executor = ThreadPoolExecutor(max_workers=background_workers,
+                                                      thread_name_prefix="background-worker")
+        self.background_pending = 0
+        self._background_lock = threading.Lock()
+
+        # Semaphore is bound to the event loop that first uses it
+        self._semaphore = None
+        self._loop = None
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+        return self._semaphore
+
+    def retry_after(self) -> int:
+        """
+        Rough estimate (seconds) of when a slot will free up
+        """
+        avg_run = self.total_run / self.completed if self.completed else 5.0
+        batches = (self.waiting + self.in_flight) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(avg_run * batches))
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) on the tool executor once a slot is free
+        A `deadline` keyword argument (passed on to func) also bounds the wait
+        Raises HTTPException 429 (queue full) or 503 (waited too long)
+        """
+        semaphore = self._get_semaphore()
+
+        timeout = self.queue_timeout
+        deadline = kwargs.get("deadline")
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining())
+
+        if self.in_flight >= self.max_concurrent and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Server is busy processing other requests. Please retry shortly.",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+
+        self.waiting += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            if timeout < self.queue_timeout:
+                detail = "Request deadline passed while waiting for a free worker. Please retry shortly."
+            else:
+                detail = "Timed out waiting for a free worker. Please retry shortly."
+            raise HTTPException(
+                status_code=503,
+                detail=detail,
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+        self.in_flight += 1
+        run_start = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_run += time.monotonic() - run_start
+            semaphore.release()
+
+    def submit_background(self, func: Callable, *args, **kwargs):
+        """
+        Queue work on the background pool without waiting for it (e.g. indexing
+        right after upload). Separate from the tool executor, so admitted
+        requests never wait behind it; errors are printed.
+        """
+        with self._background_lock:
+            self.background_pending += 1
+        future = self.background_executor.submit(func, *args, **kwargs)
+        future.add_done_callback(self._background_done)
+        return future
+
+    def _background_done(self, future) -> None:
+        with self._background_lock:
+            self.background_pending -= 1
+        error = future.exception()
+        if error is not None:
+            print(f"Background tool job failed: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth and wait time, for the /status endpoint
+        """
+        admitted = self.completed + self.in_flight
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self.total_wait / admitted * 1000, 1) if admitted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "avg_run_ms": round(self.total_run / self.completed * 1000, 1) if self.completed else 0.0,
+            "background_pending": self.background_pending,
+        }
+
+
+# One controller per worker process
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("TOOL_MAX_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("TOOL_MAX_QUEUE", "8")),
+    queue_timeout=float(os.getenv("TOOL_QUEUE_TIMEOUT", "30")),
+    background_workers=int(os.getenv("TOOL_BACKGROUND_WORKERS", "1")),
+)
@@ -0,0 +1,126 @@
+"""
+Unpacking zip / tar.gz uploads
+
+Archives are read member by member from the uploaded (spooled-to-disk) file -
+tar.gz as a forward-only stream, zip through its central directory - so the
+whole archive is never held in memory. Only .pdf / .txt members are kept;
+each is written to the upload directory under its base name (no archive paths,
+so nothing can land outside it) and handed to `on_member` right away, so
+indexing starts while the rest of the archive is still being unpacked.
+"""
+
+import os
+import shutil
+import tarfile
+import zipfile
+from typing import BinaryIO, Callable, Dict, List, Optional
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+ARCHIVE_EXTENSIONS = (".zip", ".tar.gz", ".tgz")
+
+# Guards against archive bombs: larger members are skipped; archives with more
+# members or more unpacked bytes in total are rejected. Sizes are counted as
+# the data is written, not taken from the (forgeable) archive headers.
+MAX_MEMBER_BYTES = int(os.getenv("ARCHIVE_MAX_MEMBER_MB", "200")) * 1024 * 1024
+MAX_TOTAL_BYTES = int(os.getenv("ARCHIVE_MAX_TOTAL_MB", "1024")) * 1024 * 1024
+MAX_MEMBERS = int(os.getenv("ARCHIVE_MAX_MEMBERS", "1000"))
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def member_filename(name: str) -> Optional[str]:
+    """
+    Base name to store an archive member under, or None if it should be skipped
+    (unsupported type, hidden file, macOS resource fork)
+    """
+    base = os.path.basename(name.replace("\\", "/"))
+    root, ext = os.path.splitext(base)
+    if not root or base.startswith(".") or "__MACOSX/" in name or ext.lower() not in SUPPORTED_EXTENSIONS:
+        return None
+    # Tools dispatch on the lower-case extension
+    return root + ext.lower()
+
+
+def unique_path(directory: str, filename: str) -> str:
+    """
+    Path in directory that doesn't overwrite an existing file (report.pdf, report (2).pdf, ...)
+    """
+    root, ext = os.path.splitext(filename)
+    path = os.path.join(directory, filename)
+    counter = 2
+    while os.path.exists(path):
+        path = os.path.join(directory, f"{root} ({counter}){ext}")
+        counter += 1
+    return path
+
+
+def unpack(fileobj: BinaryIO, archive_name: str, directory: str,
+           on_member: Callable[[str], None]) -> Dict[str, List[str]]:
+    """
+    Extract the supported members of a zip / tar.gz archive into directory
+    Calls on_member(path) as soon as each member is written
+    Returns {"files": [paths], "skipped": [member names]}
+    Raises ValueError if the archive can't be unpacked or is over the limits;
+    members already written are removed
+    """
+    result = {"files": [], "skipped": []}
+    counts = {"members": 0, "bytes": 0}
+
+    def store(name: str, size: int, open_member: Callable[[], BinaryIO]):
+        counts["members"] += 1
+        if counts["members"] > MAX_MEMBERS:
+            raise ValueError(f"Archive has more than {MAX_MEMBERS} members")
+
+        filename = member_filename(name)
+        if filename is None or size > MAX_MEMBER_BYTES:
+            result["skipped"].append(name)
+            return
+        if counts["bytes"] + size > MAX_TOTAL_BYTES:
+            raise ValueError(f"{name}: archive's unpacked size is over the limit")
+
+        path = unique_path(directory, filename)
+        with open_member() as source, open(path, "wb") as target:
+            result["files"].append(path)
+            member_bytes = 0
+            for chunk in iter(lambda: source.read(COPY_CHUNK_BYTES), b""):
+                member_bytes += len(chunk)
+                counts["bytes"] += len(chunk)
+                if member_bytes > MAX_MEMBER_BYTES or counts["bytes"] > MAX_TOTAL_BYTES:
+                    raise ValueError(f"{name}: archive's unpacked size is over the limit")
+                target.write(chunk)
+        on_member(path)
+
+    try:
+        try:
+            if archive_name.lower().endswith(".zip"):
+                with zipfile.ZipFile(fileobj) as archive:
+                    for info in archive.infolist():
+                        if not info.is_dir():
+                            store(info.filename, info.file_size, lambda info=info: archive.open(info))
+            else:
+                # "r|gz": a single forward pass, no seeking
+                with tarfile.open(fileobj=fileobj, mode="r|gz") as archive:
+                    for member in archive:
+                        if member.isfile():
+                            store(member.name, member.size, lambda member=member: archive.extractfile(member))
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, tarfile.TarError, EOFError, OSError,
+                RuntimeError, NotImplementedError) as e:
+            # RuntimeError: encrypted zip member, NotImplementedError: unsupported compression
+            raise ValueError(f"Could not unpack archive: {e}")
+    except ValueError:
+        remove_files(result["files"])
+        raise
+
+    return result
+
+
+def remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError as e:
+            print(f"Error deleting {path}: {e}")
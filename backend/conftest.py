@@ -0,0 +1,2 @@
+# test_api.py is a manual script that needs a running server (python main.py)
+collect_ignore = ["test_api.py"]
@@ -0,0 +1,158 @@
+"""
+ETags, conditional responses and compression for tool results
+
+A tool result is identified by the tool name + version and the name and content
+hash of every input document, so the ETag can be computed before running the tool:
+    - If-None-Match matches   -> 304, nothing recomputed or re-sent
+    - result already computed -> served from cache/responses/ (JSON) or cache/xlsx/
+    - otherwise the tool runs and its result is stored under the ETag
+JSON bodies over COMPRESS_MIN_BYTES are sent brotli- or gzip-encoded when the
+client accepts it.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request, Response
+
+from tools import TOOL_VERSIONS
+from tools.result_cache import CACHE_DIR, file_digest, load_result, save_result
+
+try:
+    import brotli
+except ImportError:  # brotli is optional - fall back to gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+
+# Results with these markers are incomplete and must not be cached
+UNCACHEABLE_MARKERS = ["Error extracting information", "Error generating answer"]
+
+# (etag, encoding) -> encoded body, so repeat views don't recompress
+_encoded: "OrderedDict[tuple, bytes]" = OrderedDict()
+_encoded_lock = threading.Lock()
+MAX_ENCODED_ENTRIES = 64
+
+
+def result_etag(tool: str, file_paths: List[str], *params: str) -> str:
+    """
+    Strong ETag for a tool run over these documents with these options
+    (quoted, as sent in headers)
+    """
+    sha = hashlib.sha256()
+    sha.update(f"{tool}:{TOOL_VERSIONS.get(tool, '0')}:{':'.join(params)}".encode())
+    for file_path in file_paths:
+        # File names are part of the result (source_files), not just the content
+        sha.update(b"\0")
+        sha.update(os.path.basename(file_path).encode())
+        sha.update(b"\0")
+        sha.update(file_digest(file_path).encode())
+    return f'"{sha.hexdigest()[:32]}"'
+
+
+def etag_key(etag: str) -> str:
+    return etag.strip('"')
+
+
+def matches(request: Request, etag: str) -> bool:
+    """
+    True if the request's If-None-Match covers this ETag
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def is_cacheable(payload: Dict[str, Any]) -> bool:
+    """
+    Only complete results are cached (no error / failed-LLM / deadline markers)
+    """
+    if "error" in payload or "degraded" in payload:
+        return False
+    body = json.dumps(payload)
+    return not any(marker in body for marker in UNCACHEABLE_MARKERS)
+
+
+def load_json(etag: str) -> Optional[Dict[str, Any]]:
+    return load_result("responses", etag_key(etag))
+
+
+def store_json(etag: str, payload: Dict[str, Any]) -> bool:
+    """
+    Cache a JSON result under its ETag; returns False if it isn't cacheable
+    """
+    if not is_cacheable(payload):
+        return False
+    save_result("responses", etag_key(etag), payload)
+    return True
+
+
+def xlsx_path(etag: str) -> str:
+    """
+    Where the Excel result for this ETag lives
+    """
+    directory = os.path.join(CACHE_DIR, "xlsx")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{etag_key(etag)}.xlsx")
+
+
+def choose_encoding(request: Request) -> Optional[str]:
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in request.headers.get("accept-encoding", "").split(",")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def encode(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def json_response(request: Request, payload: Any, etag: Optional[str] = None,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    JSON response with optional ETag, compressed if the client accepts it
+    """
+    headers = dict(headers or {})
+    body = json.dumps(payload).encode("utf-8")
+
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "no-cache"
+
+    if len(body) >= COMPRESS_MIN_BYTES:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = choose_encoding(request)
+        if encoding:
+            cache_key = (etag, encoding)
+            encoded = _encoded.get(cache_key) if etag else None
+            if encoded is None:
+                encoded = encode(body, encoding)
+                if etag:
+                    with _encoded_lock:
+                        _encoded[cache_key] = encoded
+                        while len(_encoded) > MAX_ENCODED_ENTRIES:
+                            _encoded.popitem(last=False)
+            body = encoded
+            headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,425 @@
+"""
+Load Test Harness for Research Portal Backend
+
+Starts the API in-process (uvicorn on a local port) together with a mock
+OpenAI server, drives mixed upload / extraction / summary traffic at a fixed
+concurrency and reports throughput, latency percentiles and error rates per
+endpoint. Runs fully offline - no OpenAI key or network needed.
+
+Usage:
+    python loadtest.py --concurrency 8 --requests 200 --llm-latency 0.8
+    python loadtest.py --duration 60 --max-p95-ms 5000 --max-error-rate 0.01
+
+Exit code is 1 if a --max-* gate is exceeded, so it can be used as a
+capacity-planning check.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_FILES = ["sample_financial_report.txt", "sample_earnings_call.txt"]
+
+# endpoint name -> (method, path)
+ENDPOINTS = {
+    "upload": ("POST", "/upload"),
+    "files": ("GET", "/files"),
+    "extraction": ("POST", "/tools/financial-extraction"),
+    "summary": ("POST", "/tools/earnings-summary"),
+}
+DEFAULT_MIX = "upload=1,files=1,extraction=2,summary=2"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    Minimal /v1/chat/completions with configurable latency and failure rate
+    Answers in the shape each prompt asks for (JSON array, JSON object or text)
+    """
+    latency = 0.5
+    jitter = 0.2
+    failure_rate = 0.0
+    calls = 0
+    failures = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        handler = type(self)
+        with handler.lock:
+            handler.calls += 1
+
+        time.sleep(max(0.0, random.uniform(handler.latency - handler.jitter, handler.latency + handler.jitter)))
+
+        if random.random() < handler.failure_rate:
+            with handler.lock:
+                handler.failures += 1
+            self.send_json(500, {"error": {"message": "Mock LLM failure", "type": "server_error"}})
+            return
+
+        prompt = json.loads(body)["messages"][0]["content"]
+        if "JSON array" in prompt:
+            content = '["Mock point one", "Mock point two", "Mock point three"]'
+        elif "JSON object" in prompt:
+            content = '{"Currency": "Unknown", "Years": [], "Items": {}}'
+        else:
+            content = "Mock answer based on the provided text."
+
+        self.send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-4o-mini",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}
+        })
+
+    def send_json(self, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # keep the report readable
+
+
+def start_mock_openai(latency: float, jitter: float, failure_rate: float) -> ThreadingHTTPServer:
+    MockOpenAIHandler.latency = latency
+    MockOpenAIHandler.jitter = min(jitter, latency)
+    MockOpenAIHandler.failure_rate = failure_rate
+    MockOpenAIHandler.calls = 0
+    MockOpenAIHandler.failures = 0
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), MockOpenAIHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+def reset_openai_clients():
+    """
+    Drop the tool modules' cached OpenAI clients (they point at the mock server)
+    """
+    for module_name in ("tools.earnings_summarizer", "tools.financial_extractor", "tools.retrieval"):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            module._client = None
+
+
+def start_app(port: int) -> tuple:
+    """
+    Import main and serve it with uvicorn in a background thread
+    Returns (server, thread)
+    """
+    import uvicorn
+
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+
+    # main creates uploads/ on import - it may already have been imported
+    # from another directory
+    os.makedirs(main.UPLOAD_DIR, exist_ok=True)
+
+    config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name="app-server", daemon=True)
+    thread.start()
+
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("App server did not start within 30 seconds")
+        time.sleep(0.05)
+    return server, thread
+
+
+def multipart_body(files: List[tuple]) -> tuple:
+    """
+    Encode [(filename, bytes), ...] as multipart/form-data for the "files" field
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for filename, content in files:
+        parts.append(
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+            f"Content-Type: text/plain\r\n\r\n".encode("utf-8") + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def load_documents(unique: bool) -> List[tuple]:
+    """
+    Sample documents to upload; unique=True adds a nonce so every upload
+    misses the result caches and the tools do real work
+    """
+    documents = []
+    for filename in SAMPLE_FILES:
+        with open(os.path.join(BACKEND_DIR, filename), "rb") as f:
+            content = f.read()
+        if unique:
+            content += f"\n\nRef: {uuid.uuid4().hex}\n".encode("utf-8")
+        documents.append((filename, content))
+    return documents
+
+
+def send_request(port: int, endpoint: str, unique_documents: bool, timeout: float) -> int:
+    method, path = ENDPOINTS[endpoint]
+    body, headers = None, {}
+    if endpoint == "upload":
+        body, content_type = multipart_body(load_documents(unique_documents))
+        headers["Content-Type"] = content_type
+
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name} (choose from {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def run_load_test(concurrency: int = 4, requests: int = 100, duration: float = None,
+                  mix: str = DEFAULT_MIX, llm_latency: float = 0.5, llm_jitter: float = 0.2,
+                  llm_failure_rate: float = 0.0, unique_documents: bool = True,
+                  timeout: float = 120.0, verbose: bool = False) -> Dict[str, Any]:
+    """
+    Run the load test and return the report as a dict
+    Stops after `requests` requests, or after `duration` seconds if given
+    The app's own progress output is hidden unless verbose=True
+    """
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        return _run_load_test(concurrency, requests, duration, mix, llm_latency, llm_jitter,
+                              llm_failure_rate, unique_documents, timeout)
+
+
+def _run_load_test(concurrency, requests, duration, mix, llm_latency, llm_jitter,
+                   llm_failure_rate, unique_documents, timeout) -> Dict[str, Any]:
+    weights = parse_mix(mix)
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    mock = start_mock_openai(llm_latency, llm_jitter, llm_failure_rate)
+
+    # The app reads these when it creates its OpenAI client / resolves its dirs
+    # (restored afterwards, so nothing leaks into the calling process)
+    overrides = {
+        "OPENAI_API_KEY": "mock-key",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{mock.server_address[1]}/v1",
+        "PREWARM_TOOLS": "1",
+    }
+    previous_env = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    server = None
+
+    results = []
+    results_lock = threading.Lock()
+    issued = 0
+    issued_lock = threading.Lock()
+    names = list(weights)
+
+    def worker():
+        nonlocal issued
+        while True:
+            with issued_lock:
+                if duration is None and issued >= requests:
+                    return
+                issued += 1
+            if duration is not None and time.perf_counter() - start >= duration:
+                return
+
+            endpoint = random.choices(names, weights=[weights[n] for n in names])[0]
+            request_start = time.perf_counter()
+            try:
+                status = send_request(port, endpoint, unique_documents, timeout)
+            except Exception as e:
+                status = f"{type(e).__name__}"
+            elapsed = time.perf_counter() - request_start
+            with results_lock:
+                results.append((endpoint, status, elapsed))
+
+    try:
+        port = free_port()
+        server, server_thread = start_app(port)
+
+        # Seed one upload so tool endpoints have documents from the start
+        send_request(port, "upload", unique_documents, timeout)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        wall_time = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.should_exit = True
+            server_thread.join(timeout=10)
+        mock.shutdown()
+        mock.server_close()
+        os.chdir(previous_cwd)
+        for name, value in previous_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        reset_openai_clients()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return build_report(results, wall_time, concurrency, llm_latency, llm_failure_rate)
+
+
+def build_report(results: List[tuple], wall_time: float, concurrency: int,
+                 llm_latency: float, llm_failure_rate: float) -> Dict[str, Any]:
+    endpoints = {}
+    for name in sorted({endpoint for endpoint, _, _ in results}):
+        rows = [(status, elapsed) for endpoint, status, elapsed in results if endpoint == name]
+        latencies = sorted(elapsed * 1000 for _, elapsed in rows)
+        rejected = sum(1 for status, _ in rows if status in (429, 503))
+        errors = sum(1 for status, _ in rows if not isinstance(status, int) or status >= 400)
+        endpoints[name] = {
+            "requests": len(rows),
+            "errors": errors,
+            "rejected": rejected,
+            "error_rate": round(errors / len(rows), 4),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(latencies[-1], 1),
+        }
+
+    total_errors = sum(e["errors"] for e in endpoints.values())
+    return {
+        "concurrency": concurrency,
+        "llm_latency_s": llm_latency,
+        "llm_failure_rate": llm_failure_rate,
+        "llm_calls": MockOpenAIHandler.calls,
+        "llm_failures": MockOpenAIHandler.failures,
+        "total_requests": len(results),
+        "wall_time_s": round(wall_time, 2),
+        "throughput_rps": round(len(results) / wall_time, 2) if wall_time else 0.0,
+        "error_rate": round(total_errors / len(results), 4) if results else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print("=" * 78)
+    print("Research Portal Backend - Load Test")
+    print("=" * 78)
+    print(f"Concurrency: {report['concurrency']}   "
+          f"Mock LLM latency: {report['llm_latency_s']}s   "
+          f"Mock LLM failure rate: {report['llm_failure_rate']:.0%}")
+    print(f"Requests: {report['total_requests']} in {report['wall_time_s']}s   "
+          f"Throughput: {report['throughput_rps']} req/s   "
+          f"Error rate: {report['error_rate']:.2%}")
+    print(f"LLM calls: {report['llm_calls']} ({report['llm_failures']} failed)")
+    print()
+    print(f"{'Endpoint':<12}{'Reqs':>6}{'Errors':>8}{'429/503':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<12}{stats['requests']:>6}{stats['errors']:>8}{stats['rejected']:>9}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    print("=" * 78)
+
+
+def check_gates(report: Dict[str, Any], max_p95_ms: float = None, max_error_rate: float = None) -> List[str]:
+    """
+    Return a list of gate violations (empty if all gates pass)
+    """
+    violations = []
+    if max_error_rate is not None and report["error_rate"] > max_error_rate:
+        violations.append(f"error rate {report['error_rate']:.2%} > {max_error_rate:.2%}")
+    if max_p95_ms is not None:
+        for name, stats in report["endpoints"].items():
+            if stats["p95_ms"] > max_p95_ms:
+                violations.append(f"{name} p95 {stats['p95_ms']} ms > {max_p95_ms} ms")
+    return violations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test for the Research Portal API")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent simulated analysts")
+    parser.add_argument("--requests", type=int, default=100, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="run for this many seconds instead")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mock LLM mean latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="mock LLM latency jitter in seconds")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="fraction of mock LLM calls that fail")
+    parser.add_argument("--warm-cache", action="store_true", help="upload identical documents (cache hits)")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="fail if any endpoint p95 exceeds this")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="fail if the error rate exceeds this")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own output")
+    args = parser.parse_args()
+
+    report = run_load_test(
+        concurrency=args.concurrency,
+        requests=args.requests,
+        duration=args.duration,
+        mix=args.mix,
+        llm_latency=args.llm_latency,
+        llm_jitter=args.llm_jitter,
+        llm_failure_rate=args.llm_failure_rate,
+        unique_documents=not args.warm_cache,
+        verbose=args.verbose,
+    )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    violations = check_gates(report, args.max_p95_ms, args.max_error_rate)
+    for violation in violations:
+        print(f"GATE FAILED: {violation}")
+    sys.exit(1 if violations else 0)
@@ -1,20 +1,41 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 import os
 import shutil
+import uuid
 from typing import List
+from pydantic import BaseModel
 from dotenv import load_dotenv
 
-# Import our tool modules
-from tools.financial_extractor import extract_financial_data
-from tools.earnings_summarizer import summarize_earnings_call
+# Tool registry - tool modules (pandas, PyPDF2, OpenAI) are imported lazily
+from tools import get_tool, prewarm_in_background
+from tools.deadline import Deadline
+from admission import admission
+import archives
+import profiling
+import http_cache
 
 # Load environment variables
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Import tool modules in the background once the server is accepting requests
+    Set PREWARM_TOOLS=0 to load them only on first use
+    """
+    if os.getenv("PREWARM_TOOLS", "1") != "0":
+        prewarm_in_background()
+    yield
+
+
 # Create FastAPI app
-app = FastAPI(title="Research Portal API")
+app = FastAPI(title="Research Portal API", lifespan=lifespan)
 
 # CORS middleware for frontend
 app.add_middleware(
@@ -23,6 +44,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Profile-Id", "Retry-After", "X-Degraded"],
 )
 
 # Create uploads directory if it doesn't exist
@@ -32,6 +54,9 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 # Global variable to store current session files
 current_files = []
 
+# Upper bound for a per-request deadline override
+MAX_DEADLINE_SECONDS = float(os.getenv("TOOL_MAX_DEADLINE_SECONDS", "300"))
+
 
 @app.get("/")
 def home():
@@ -39,15 +64,25 @@ def home():
     return {
         "message": "Research Portal API",
         "version": "1.0",
-        "tools": ["financial_extraction", "earnings_summary"]
+        "tools": ["financial_extraction", "earnings_summary", "earnings_comparison", "ask"]
     }
 
 
+def index_document(file_path: str):
+    """
+    Build one document's /tools/ask passage index (runs on the background pool)
+    The combined index is assembled from these on the first question
+    """
+    return get_tool("document_index")(file_path)
+
+
 @app.post("/upload")
 async def upload_documents(files: List[UploadFile] = File(...)):
     """
     Upload one or more documents
     Stores them temporarily in uploads/ folder
+    .zip / .tar.gz / .tgz archives are unpacked (PDF / TXT members only), and
+    each document is indexed as soon as it is unpacked
     """
     global current_files
     
@@ -62,9 +97,30 @@ async def upload_documents(files: List[UploadFile] = File(...)):
     
     current_files = []
     uploaded_files = []
+    skipped = []
     
     # Save new files
     for file in files:
+        if archives.is_archive(file.filename):
+            # Unpacked on a worker thread, streaming from the spooled upload
+            try:
+                unpacked = await run_in_threadpool(
+                    archives.unpack, file.file, file.filename, UPLOAD_DIR,
+                    lambda path: admission.submit_background(index_document, path)
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
+            
+            for file_path in unpacked["files"]:
+                current_files.append(file_path)
+                uploaded_files.append({
+                    "filename": os.path.basename(file_path),
+                    "size": os.path.getsize(file_path),
+                    "archive": file.filename
+                })
+            skipped.extend(f"{file.filename}/{name}" for name in unpacked["skipped"])
+            continue
+        
         file_path = os.path.join(UPLOAD_DIR, file.filename)
         
         # Save file
@@ -76,11 +132,16 @@ async def upload_documents(files: List[UploadFile] = File(...)):
             "filename": file.filename,
             "size": os.path.getsize(file_path)
         })
+        # Indexed for /tools/ask in the background
+        admission.submit_background(index_document, file_path)
     
-    return {
-        "message": f"Uploaded {len(files)} file(s) successfully",
+    response = {
+        "message": f"Uploaded {len(uploaded_files)} file(s) successfully",
         "files": uploaded_files
     }
+    if skipped:
+        response["skipped"] = skipped
+    return response
 
 
 @app.get("/files")
@@ -96,18 +157,120 @@ def list_uploaded_files():
     return {"files": files_info}
 
 
+@app.get("/status")
+def service_status():
+    """Tool worker load: in-flight jobs, queue depth and wait times"""
+    return {"tool_workers": admission.stats()}
+
+
+def request_deadline(request: Request) -> Deadline:
+    """
+    Time budget for a tool request, counted from its arrival
+    Override the TOOL_DEADLINE_SECONDS default with X-Deadline-Ms or ?deadline_ms=
+    """
+    value = request.headers.get("x-deadline-ms") or request.query_params.get("deadline_ms")
+    if value is None:
+        return Deadline()
+    
+    try:
+        seconds = float(value) / 1000
+    except ValueError:
+        seconds = 0
+    if not 0 < seconds <= MAX_DEADLINE_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"deadline_ms must be a number between 1 and {MAX_DEADLINE_SECONDS * 1000:.0f}"
+        )
+    return Deadline(seconds)
+
+
+def degraded_headers(deadline: Deadline) -> dict:
+    """
+    X-Degraded lists the fields that were cut short by the deadline
+    """
+    if not deadline.degraded:
+        return {}
+    return {"X-Degraded": ",".join(sorted(deadline.degraded))}
+
+
+def tool_job(request: Request, func):
+    """
+    Wrap a tool function for profiling if the request asked for it
+    Returns (function to run, extra response headers)
+    """
+    profile_id = profiling.requested(request)
+    if profile_id is None:
+        return func, {}
+    return profiling.profiled(func, profile_id), {"X-Profile-Id": profile_id}
+
+
+async def run_json_tool(request: Request, tool_name: str, file_paths: List[str], mode: str,
+                        deadline: Deadline) -> Response:
+    """
+    Run a JSON tool with ETag / 304 handling and cached results
+    Profiled requests always run the tool and skip the cache
+    Results degraded by the deadline are returned but never cached
+    """
+    func, headers = tool_job(request, get_tool(tool_name))
+    
+    etag = None
+    if not headers:
+        etag = await run_in_threadpool(http_cache.result_etag, tool_name, file_paths, mode)
+        if http_cache.matches(request, etag):
+            return http_cache.not_modified(etag)
+        cached = http_cache.load_json(etag)
+        if cached is not None:
+            return http_cache.json_response(request, cached, etag)
+    
+    # Runs on the tool worker pool, not the event loop
+    result = await admission.run(func, file_paths, mode, deadline=deadline)
+    
+    # Don't cache incomplete results, or LLM requests that fell back to extractive
+    fell_back = result.get("summary_mode", mode) != mode
+    if etag and (fell_back or not http_cache.store_json(etag, result)):
+        etag = None
+    return http_cache.json_response(request, result, etag, {**headers, **degraded_headers(deadline)})
+
+
 @app.post("/tools/financial-extraction")
-async def run_financial_extraction():
+async def run_financial_extraction(request: Request):
     """
     Run Option A: Financial Statement Extraction
     Returns downloadable Excel file
+    Supports If-None-Match; the same documents return 304 / the cached file
+    An incomplete file (error file, failed LLM fallback, cut short by the
+    deadline) is returned without an ETag and not cached
     """
     if not current_files:
         raise HTTPException(status_code=400, detail="No files uploaded. Please upload documents first.")
     
+    deadline = request_deadline(request)
+    file_paths = list(current_files)
+    
     try:
-        # Process files and generate Excel
-        output_file = extract_financial_data(current_files)
+        extract_financial_data, headers = tool_job(request, get_tool("financial_extraction"))
+        
+        etag = await run_in_threadpool(http_cache.result_etag, "financial_extraction", file_paths)
+        if not headers and http_cache.matches(request, etag):
+            return http_cache.not_modified(etag)
+        
+        output_file = http_cache.xlsx_path(etag)
+        if headers or not os.path.exists(output_file):
+            # Process files and generate Excel
+            # Runs on the tool worker pool, not the event loop
+            # Write to a temp file first so concurrent requests never read a half-written file
+            tmp_file = f"{os.path.splitext(output_file)[0]}.{uuid.uuid4().hex}.tmp.xlsx"
+            _, complete = await admission.run(extract_financial_data, file_paths, tmp_file, deadline=deadline)
+            
+            if not complete:
+                return FileResponse(
+                    tmp_file,
+                    media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    filename="financial_extraction.xlsx",
+                    headers={**headers, **degraded_headers(deadline), "Cache-Control": "no-store"},
+                    background=BackgroundTask(os.unlink, tmp_file)
+                )
+            os.replace(tmp_file, output_file)
         
         if not os.path.exists(output_file):
             raise HTTPException(status_code=500, detail="Failed to generate Excel file")
@@ -115,31 +278,142 @@ async def run_financial_extraction():
         return FileResponse(
             output_file,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            filename="financial_extraction.xlsx"
+            filename="financial_extraction.xlsx",
+            headers={**headers, "ETag": etag, "Cache-Control": "no-cache"}
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing financial data: {str(e)}")
 
 
+def check_summary_mode(mode: str):
+    if mode not in ("llm", "extractive"):
+        raise HTTPException(status_code=400, detail="mode must be 'llm' or 'extractive'")
+
+
 @app.post("/tools/earnings-summary")
-async def run_earnings_summary():
+async def run_earnings_summary(request: Request, mode: str = "llm"):
     """
     Run Option B: Earnings Call Summary
+    mode: "llm" (default) or "extractive" (local preview in well under a second, no LLM calls)
     Returns structured JSON
+    Supports If-None-Match; the same documents return 304 / the cached summary
     """
+    check_summary_mode(mode)
     if not current_files:
         raise HTTPException(status_code=400, detail="No files uploaded. Please upload documents first.")
     
+    deadline = request_deadline(request)
+    
     try:
         # Process files and generate summary
-        summary = summarize_earnings_call(current_files)
-        return summary
+        return await run_json_tool(request, "earnings_summary", list(current_files), mode, deadline)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating summary: {str(e)}")
 
 
+@app.post("/tools/earnings-comparison")
+async def run_earnings_comparison(request: Request, mode: str = "extractive"):
+    """
+    Compare earnings calls quarter over quarter
+    Each uploaded transcript is summarized separately (cached per document)
+    mode: "extractive" (default for bulk runs) or "llm" (refined key points)
+    Returns structured JSON
+    Supports If-None-Match; the same documents return 304 / the cached comparison
+    """
+    check_summary_mode(mode)
+    if not current_files:
+        raise HTTPException(status_code=400, detail="No files uploaded. Please upload documents first.")
+    
+    deadline = request_deadline(request)
+    
+    try:
+        return await run_json_tool(request, "earnings_comparison", list(current_files), mode, deadline)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error comparing earnings calls: {str(e)}")
+
+
+class AskRequest(BaseModel):
+    question: str
+    top_k: int = 5
+
+
+@app.post("/tools/ask")
+async def run_ask(ask: AskRequest, request: Request, response: Response):
+    """
+    Answer a question about the uploaded documents
+    Only the top-k matching passages are sent to the LLM
+    Returns JSON with the answer and the passages used
+    """
+    if not current_files:
+        raise HTTPException(status_code=400, detail="No files uploaded. Please upload documents first.")
+    
+    if not ask.question.strip():
+        raise HTTPException(status_code=400, detail="Question must not be empty.")
+    
+    top_k = max(1, min(ask.top_k, 20))
+    deadline = request_deadline(request)
+    
+    try:
+        # Runs on the tool worker pool, not the event loop
+        answer_question, headers = tool_job(request, get_tool("ask"))
+        answer = await admission.run(answer_question, list(current_files), ask.question, top_k, deadline=deadline)
+        response.headers.update({**headers, **degraded_headers(deadline)})
+        return answer
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error answering question: {str(e)}")
+
+
+@app.get("/profiles")
+def list_profiles(request: Request):
+    """List saved request profiles (admin only)"""
+    if not profiling.is_admin(request):
+        raise HTTPException(status_code=403, detail="Profiling token required.")
+    return {"profiles": profiling.list_profiles()}
+
+
+@app.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, request: Request, format: str = "pstats"):
+    """
+    Download a saved request profile (admin only)
+    format: pstats (.prof file), folded (stacks for flamegraph.pl / speedscope),
+            flamegraph (SVG) or text (top functions by cumulative time)
+    """
+    if not profiling.is_admin(request):
+        raise HTTPException(status_code=403, detail="Profiling token required.")
+    
+    try:
+        prof_path = profiling.profile_path(profile_id, "prof")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not os.path.exists(prof_path):
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    
+    if format == "pstats":
+        return FileResponse(prof_path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    elif format == "folded":
+        return FileResponse(profiling.profile_path(profile_id, "folded"), media_type="text/plain",
+                            filename=f"{profile_id}.folded")
+    elif format == "flamegraph":
+        return Response(profiling.flamegraph_svg(profile_id), media_type="image/svg+xml")
+    elif format == "text":
+        return PlainTextResponse(profiling.stats_text(profile_id))
+    else:
+        raise HTTPException(status_code=400, detail="format must be pstats, folded, flamegraph or text")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,203 @@
+"""
+On-demand profiling of a single tool request
+
+Send `X-Profile-Token: <PROFILING_TOKEN>` with a tool request to profile just
+that request. The token is only read from the header - in a URL it would end
+up in access logs, proxy logs and browser history. The tool job then runs under
+cProfile plus a stack sampler on its worker thread, and the profile is saved
+under PROFILE_DIR:
+    <id>.prof    - cProfile stats (load with pstats / snakeviz)
+    <id>.folded  - sampled stacks in folded format (flamegraph.pl / speedscope)
+The id is returned in the X-Profile-Id response header.
+
+Profiling is disabled unless PROFILING_TOKEN is set. Requests without the
+token run the tool function directly - no wrapper, no overhead.
+"""
+
+import cProfile
+import html
+import io
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+from fastapi import Request
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{12}$")
+
+
+def is_admin(request: Request) -> bool:
+    """
+    True if the request carries the profiling admin token
+    """
+    token = os.getenv("PROFILING_TOKEN")
+    if not token:
+        return False
+
+    supplied = request.headers.get("x-profile-token")
+    return bool(supplied) and secrets.compare_digest(supplied, token)
+
+
+def requested(request: Request) -> Optional[str]:
+    """
+    Return a new profile id if this request asked for profiling, else None
+    """
+    if not is_admin(request):
+        return None
+    return uuid.uuid4().hex[:12]
+
+
+def profile_path(profile_id: str, extension: str) -> str:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        raise ValueError(f"Invalid profile id: {profile_id}")
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{extension}")
+
+
+def profiled(func: Callable, profile_id: str) -> Callable:
+    """
+    Wrap func so the call is profiled on whatever thread runs it
+    """
+    def wrapper(*args, **kwargs):
+        sampler = StackSampler(threading.get_ident())
+        profiler = cProfile.Profile()
+        sampler.start()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            sampler.stop()
+            save_profile(profile_id, profiler, sampler.stacks)
+
+    return wrapper
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples one thread's call stack every SAMPLE_INTERVAL seconds
+    """
+
+    def __init__(self, target_thread_id: int):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.target_thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                names.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def save_profile(profile_id: str, profiler: cProfile.Profile, stacks: Counter) -> None:
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(profile_path(profile_id, "prof"))
+        with open(profile_path(profile_id, "folded"), "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+    except Exception as e:
+        print(f"Error saving profile {profile_id}: {e}")
+
+
+def stats_text(profile_id: str, limit: int = 40) -> str:
+    """
+    Top functions by cumulative time, as plain text
+    """
+    output = io.StringIO()
+    stats = pstats.Stats(profile_path(profile_id, "prof"), stream=output)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return output.getvalue()
+
+
+def flamegraph_svg(profile_id: str, width: int = 1200, row_height: int = 16) -> str:
+    """
+    Render the sampled stacks as a simple SVG flame graph
+    """
+    root: Dict = {"name": "all", "count": 0, "children": {}}
+    with open(profile_path(profile_id, "folded"), "r", encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            count = int(count)
+            node = root
+            node["count"] += count
+            for name in stack.split(";"):
+                node = node["children"].setdefault(name, {"name": name, "count": 0, "children": {}})
+                node["count"] += count
+
+    total = max(root["count"], 1)
+    rects = []
+    max_depth = 0
+
+    def layout(node, x, depth):
+        nonlocal max_depth
+        max_depth = max(max_depth, depth)
+        node_width = node["count"] / total * width
+        rects.append((x, depth, node_width, node))
+        child_x = x
+        for child in sorted(node["children"].values(), key=lambda c: c["name"]):
+            layout(child, child_x, depth + 1)
+            child_x += child["count"] / total * width
+
+    layout(root, 0.0, 0)
+
+    height = (max_depth + 1) * row_height
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+    ]
+    for x, depth, node_width, node in rects:
+        if node_width < 0.5:
+            continue
+        y = height - (depth + 1) * row_height
+        name = html.escape(node["name"])
+        percent = node["count"] / total * 100
+        hue = 20 + (sum(map(ord, node["name"])) % 40)
+        parts.append(
+            f'<g><title>{name} ({node["count"]} samples, {percent:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{node_width:.1f}" height="{row_height - 1}" '
+            f'fill="hsl({hue},80%,60%)"/>'
+        )
+        if node_width > 40:
+            label = html.escape(node["name"][: int(node_width / 7)])
+            parts.append(f'<text x="{x + 2:.1f}" y="{y + row_height - 4}">{label}</text>')
+        parts.append("</g>")
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def list_profiles() -> list:
+    """
+    Saved profiles, newest first
+    """
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for filename in os.listdir(PROFILE_DIR):
+        if filename.endswith(".prof"):
+            path = os.path.join(PROFILE_DIR, filename)
+            profiles.append({
+                "profile_id": filename[:-len(".prof")],
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(os.path.getmtime(path)))
+            })
+    return sorted(profiles, key=lambda p: p["created"], reverse=True)
@@ -0,0 +1,117 @@
+"""
+Admission Control Tests
+
+Run: python -m pytest test_admission.py
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from admission import AdmissionController
+
+
+def test_rejects_with_429_when_queue_is_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(controller.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(controller.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert controller.stats()["queue_depth"] == 1
+
+        with pytest.raises(HTTPException) as exc_info:
+            await controller.run(lambda: "rejected")
+        assert exc_info.value.status_code == 429
+        assert int(exc_info.value.headers["Retry-After"]) >= 1
+
+        release.set()
+        return await running, await queued
+
+    assert asyncio.run(scenario()) == (True, "queued")
+    assert controller.stats()["rejected"] == 1
+    assert controller.stats()["completed"] == 2
+
+
+def test_returns_503_when_wait_exceeds_timeout():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(controller.run(release.wait, 5))
+        await asyncio.sleep(0.02)
+        with pytest.raises(HTTPException) as exc_info:
+            await controller.run(lambda: None)
+        release.set()
+        await running
+        return exc_info.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert "Retry-After" in error.headers
+    assert controller.stats()["timed_out"] == 1
+
+
+def test_event_loop_stays_free_while_tool_runs():
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(controller.run(release.wait, 5))
+        # The loop can still schedule other work while the tool job blocks
+        await asyncio.sleep(0.05)
+        assert not running.done()
+        release.set()
+        return await running
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_background_work_does_not_hold_up_tool_jobs():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1)
+    release = threading.Event()
+    for _ in range(5):
+        controller.submit_background(release.wait, 5)
+
+    async def scenario():
+        return await controller.run(lambda: "admitted")
+
+    assert asyncio.run(scenario()) == "admitted"
+    assert controller.stats()["background_pending"] == 5
+    release.set()
+    controller.background_executor.shutdown(wait=True)
+    assert controller.stats()["background_pending"] == 0
+
+
+def test_queue_wait_is_bounded_by_request_deadline():
+    from tools.deadline import Deadline
+
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=30)
+    release = threading.Event()
+    received = []
+
+    async def scenario():
+        running = asyncio.ensure_future(controller.run(release.wait, 5))
+        await asyncio.sleep(0.02)
+        start = time.monotonic()
+        with pytest.raises(HTTPException) as exc_info:
+            await controller.run(lambda deadline: received.append(deadline), deadline=Deadline(0.1))
+        waited = time.monotonic() - start
+        release.set()
+        await running
+        return exc_info.value, waited
+
+    error, waited = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert waited < 1
+    assert received == []
+
+    # The deadline is still passed on to the tool function
+    deadline = Deadline(5)
+    asyncio.run(controller.run(lambda deadline: received.append(deadline), deadline=deadline))
+    assert received == [deadline]
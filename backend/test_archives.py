@@ -0,0 +1,122 @@
+"""
+Archive Upload Tests
+
+Run: python -m pytest test_archives.py
+"""
+
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+import archives
+import main
+
+MEMBERS = {
+    "q1/report.pdf": b"%PDF-1.4 q1",
+    "q2/report.pdf": b"%PDF-1.4 q2",
+    "q2/transcript.TXT": b"Revenue grew 15%.",
+    "../../escape.txt": b"outside",
+    "q2/notes.docx": b"unsupported",
+    "__MACOSX/q1/._report.pdf": b"resource fork",
+}
+
+
+def make_zip():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in MEMBERS.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def make_tar_gz():
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("archive_name, make_archive", [("filings.zip", make_zip), ("filings.tar.gz", make_tar_gz)])
+def test_unpack_keeps_supported_members(tmp_path, archive_name, make_archive):
+    handed_off = []
+    result = archives.unpack(make_archive(), archive_name, str(tmp_path), handed_off.append)
+
+    names = sorted(os.path.basename(path) for path in result["files"])
+    assert names == ["escape.txt", "report (2).pdf", "report.pdf", "transcript.txt"]
+    # Everything lands in the upload directory, under its base name
+    assert all(os.path.dirname(path) == str(tmp_path) for path in result["files"])
+    assert sorted(result["skipped"]) == ["__MACOSX/q1/._report.pdf", "q2/notes.docx"]
+    # Each member is handed off as soon as it is written
+    assert handed_off == result["files"]
+
+
+def test_unreadable_archive():
+    assert archives.is_archive("Q4-filings.TGZ")
+    with pytest.raises(ValueError):
+        archives.unpack(io.BytesIO(b"not an archive"), "filings.zip", ".", lambda path: None)
+
+
+def test_encrypted_member(tmp_path):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("report.pdf", b"%PDF-1.4")
+    data = bytearray(buffer.getvalue())
+    # Set the "encrypted" flag bit in the local and central directory headers
+    data[6] |= 0x1
+    data[data.find(b"PK\x01\x02") + 8] |= 0x1
+
+    with pytest.raises(ValueError):
+        archives.unpack(io.BytesIO(bytes(data)), "filings.zip", str(tmp_path), lambda path: None)
+    assert os.listdir(tmp_path) == []
+
+
+def test_too_many_members_removes_written_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(archives, "MAX_MEMBERS", 2)
+    with pytest.raises(ValueError, match="more than 2 members"):
+        archives.unpack(make_zip(), "filings.zip", str(tmp_path), lambda path: None)
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("archive_name, make_archive", [("filings.zip", make_zip), ("filings.tar.gz", make_tar_gz)])
+def test_upload_over_total_size_is_rejected(tmp_path, monkeypatch, archive_name, make_archive):
+    monkeypatch.setattr(main, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "current_files", [])
+    monkeypatch.setattr(main.admission, "submit_background", lambda func, *args: None)
+    # Room for the first two members only
+    monkeypatch.setattr(archives, "MAX_TOTAL_BYTES", 20)
+
+    response = TestClient(main.app).post("/upload", files=[
+        ("files", (archive_name, make_archive().read(), "application/octet-stream")),
+    ])
+
+    assert response.status_code == 400
+    assert "over the limit" in response.json()["detail"]
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_indexes_each_document_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "current_files", [])
+    submitted = []
+    monkeypatch.setattr(main.admission, "submit_background", lambda func, *args: submitted.append((func, args)))
+
+    response = TestClient(main.app).post("/upload", files=[
+        ("files", ("filings.zip", make_zip().read(), "application/zip")),
+        ("files", ("q3.txt", b"Revenue grew 9%.", "text/plain")),
+    ])
+
+    assert response.status_code == 200
+    # One job per document as it lands - no second pass over the whole upload
+    assert all(func is main.index_document for func, _ in submitted)
+    assert sorted(os.path.basename(args[0]) for _, args in submitted) == [
+        "escape.txt", "q3.txt", "report (2).pdf", "report.pdf", "transcript.txt"
+    ]
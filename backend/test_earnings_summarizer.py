@@ -0,0 +1,272 @@
+"""
+Earnings Summarizer Tests (no LLM calls)
+
+Run: python -m pytest test_earnings_summarizer.py
+"""
+
+import os
+from collections import OrderedDict
+
+from tools import earnings_summarizer
+from tools.earnings_summarizer import (
+    extract_capacity_utilization,
+    extract_forward_guidance,
+    scan_signal_sentences,
+)
+
+
+def test_scanner_returns_sentences_with_offsets():
+    text = "Revenue was $178.4 million. Capacity utilization increased to 85%.\nNo comment."
+    sentences = scan_signal_sentences(text)
+
+    assert len(sentences) == 1
+    sentence = sentences[0]
+    assert sentence["text"] == "Capacity utilization increased to 85%."
+    assert text[sentence["start"]:sentence["end"]] == sentence["text"]
+    assert sentence["signals"] == ["capacity", "increase"]
+
+
+def test_capacity_trend_must_share_a_sentence():
+    # "increased" appears, but not next to a capacity term
+    text = "Raw material costs increased by 8%. Our plants ran at stable utilization."
+    assert extract_capacity_utilization(text) == "Stable capacity utilization mentioned"
+
+
+def test_up_and_down_only_count_before_a_figure():
+    assert extract_capacity_utilization("We set up a new production line.") == "Capacity discussed but trend unclear"
+    assert extract_capacity_utilization(
+        "Let me follow up on the manufacturing question."
+    ) == "Capacity discussed but trend unclear"
+    assert extract_capacity_utilization(
+        "Output was steady, and we wound down the old supplier contract."
+    ) == "Stable capacity utilization mentioned"
+    assert extract_capacity_utilization("Utilization was up 6% to 82%.") == "Increasing capacity utilization mentioned"
+    assert extract_capacity_utilization("Production was down to 70%.") == "Decreasing capacity utilization mentioned"
+
+
+def test_sentences_wrap_across_lines():
+    # PDF text breaks every visual line; only punctuation or a blank line ends a sentence
+    text = "Our plant capacity utilization\nincreased to 85% this quarter.\n\nOutlook\nremains unchanged"
+    sentences = scan_signal_sentences(text)
+
+    assert [s["text"] for s in sentences] == [
+        "Our plant capacity utilization\nincreased to 85% this quarter.",
+        "Outlook\nremains unchanged",
+    ]
+    assert extract_capacity_utilization(text) == "Increasing capacity utilization mentioned"
+
+
+def test_capacity_not_mentioned():
+    assert extract_capacity_utilization("Revenue increased 15%.") == "Not mentioned"
+
+
+def test_guidance_skips_llm_without_candidates(monkeypatch):
+    def fail():
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(earnings_summarizer, "get_openai_client", fail)
+    assert extract_forward_guidance("Revenue grew 15%. Margins improved.") == "Not mentioned"
+
+
+def test_detect_period_from_name_or_text():
+    from tools.earnings_summarizer import detect_period
+
+    assert detect_period("acme_q2_fy25.txt", "") == "Q2 2025"
+    assert detect_period("transcript.txt", "ACME Q4 2023 EARNINGS CALL") == "Q4 2023"
+    assert detect_period("transcript.txt", "No period here") == "Unknown"
+
+
+def test_recurring_concerns_span_quarters():
+    from tools.earnings_summarizer import find_recurring_concerns
+
+    quarters = [
+        {"period": "Q1 2024", "key_concerns": ["Supply chain challenges for components"]},
+        {"period": "Q2 2024", "key_concerns": ["Component supply chain delays", "Currency volatility"]},
+    ]
+    recurring = find_recurring_concerns(quarters)
+    assert recurring == [
+        {"concern": "Supply chain challenges for components", "periods": ["Q1 2024", "Q2 2024"]}
+    ]
+
+
+def test_extractive_summary_needs_no_llm(monkeypatch):
+    from tools.earnings_summarizer import summarize_text
+
+    def fail():
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(earnings_summarizer, "get_openai_client", fail)
+    sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_earnings_call.txt")
+    with open(sample, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    summary = summarize_text(text, ["sample_earnings_call.txt"], mode="extractive")
+
+    assert summary["summary_mode"] == "extractive"
+    assert 1 <= len(summary["key_positives"]) <= 5
+    assert 1 <= len(summary["key_concerns"]) <= 5
+    assert 1 <= len(summary["growth_initiatives"]) <= 3
+    assert "10-12% revenue growth" in summary["forward_guidance"]
+    # Every extracted point is a sentence from the transcript
+    for point in summary["key_positives"] + summary["key_concerns"]:
+        assert point in text
+
+
+def test_llm_fields_past_deadline_fall_back_to_extractive(monkeypatch):
+    from tools.deadline import Deadline
+    from tools.earnings_summarizer import summarize_text
+
+    class NoCallClient:
+        def with_options(self, **options):
+            raise AssertionError("LLM should not be called after the deadline")
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(earnings_summarizer, "get_openai_client", lambda: NoCallClient())
+    sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_earnings_call.txt")
+    with open(sample, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    deadline = Deadline(0)
+    summary = summarize_text(text, ["sample_earnings_call.txt"], mode="llm", deadline=deadline)
+
+    assert summary["summary_mode"] == "llm"
+    assert set(summary["degraded"]) == {"key_positives", "key_concerns", "growth_initiatives", "forward_guidance"}
+    assert set(deadline.degraded) == set(summary["degraded"])
+    # Lexicon / pattern-matching results are still returned
+    assert "10-12% revenue growth" in summary["forward_guidance"]
+    for point in summary["key_positives"] + summary["key_concerns"]:
+        assert point in text
+    assert summary["capacity_utilization_trends"] != "Not mentioned"
+
+
+def test_rank_sentences_prefers_central_sentence():
+    from tools.earnings_summarizer import rank_sentences
+
+    scores = rank_sentences([
+        "Revenue growth was strong in the enterprise segment.",
+        "Enterprise revenue growth drove strong results.",
+        "Strong enterprise revenue growth continued.",
+        "The weather was pleasant.",
+    ])
+    assert scores.argmin() == 3
+    assert abs(scores.sum() - 1.0) < 1e-6
+
+
+def test_comparison_only_processes_new_documents(tmp_path, monkeypatch):
+    from tools import result_cache
+    from tools.earnings_summarizer import compare_earnings_calls
+
+    monkeypatch.setattr(result_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(result_cache, "_memory", OrderedDict())
+
+    summarized = []
+    summarize_text = earnings_summarizer.summarize_text
+
+    def counting_summarize_text(text, source_files, *args, **kwargs):
+        summarized.extend(source_files)
+        return summarize_text(text, source_files, *args, **kwargs)
+
+    monkeypatch.setattr(earnings_summarizer, "summarize_text", counting_summarize_text)
+
+    paths = []
+    for quarter, growth in (("q1", 8), ("q2", 11), ("q3", 14)):
+        path = tmp_path / f"acme_{quarter}_2024.txt"
+        path.write_text(
+            f"Revenue grew {growth}% driven by strong demand. "
+            "Supply chain challenges persist for semiconductor components.",
+            encoding="utf-8",
+        )
+        paths.append(str(path))
+
+    compare_earnings_calls(paths[:2])
+    assert summarized == ["acme_q1_2024.txt", "acme_q2_2024.txt"]
+
+    comparison = compare_earnings_calls(paths)
+    # The two earlier quarters come from the cache
+    assert summarized == ["acme_q1_2024.txt", "acme_q2_2024.txt", "acme_q3_2024.txt"]
+    assert [q["period"] for q in comparison["quarters"]] == ["Q1 2024", "Q2 2024", "Q3 2024"]
+    assert len(comparison["quarter_over_quarter"]) == 2
+
+
+def test_llm_comparison_without_key_is_cached_as_extractive(tmp_path, monkeypatch):
+    from tools import result_cache
+    from tools.earnings_summarizer import compare_earnings_calls
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setattr(result_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(result_cache, "_memory", OrderedDict())
+
+    paths = []
+    for quarter in ("q1", "q2"):
+        path = tmp_path / f"acme_{quarter}_2024.txt"
+        path.write_text(f"Revenue grew strongly in {quarter}. Supply chain challenges persist.", encoding="utf-8")
+        paths.append(str(path))
+
+    comparison = compare_earnings_calls(paths, mode="llm")
+
+    # The fallback reports what ran, so the endpoint won't cache it as an LLM result
+    assert comparison["summary_mode"] == "extractive"
+    cached = sorted(os.listdir(tmp_path / "cache" / "earnings_summary"))
+    assert len(cached) == 2
+    assert all("-extractive-" in name for name in cached)
+
+
+def test_summary_of_truncated_pdf_is_not_cached(tmp_path, monkeypatch):
+    from test_financial_extractor import make_pdf
+    from tools import result_cache
+    from tools.deadline import Deadline
+    from tools.earnings_summarizer import summarize_document
+
+    monkeypatch.setattr(result_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(result_cache, "_memory", OrderedDict())
+
+    class OnePageDeadline(Deadline):
+        # Runs out after the first page
+        checks = 0
+
+        @property
+        def expired(self):
+            self.checks += 1
+            return self.checks > 1
+
+    path = tmp_path / "acme_q1_2024.pdf"
+    path.write_bytes(make_pdf([
+        "Revenue grew 12% driven by strong demand.",
+        "We expect dividend policy changes next year.",
+    ]))
+
+    truncated = summarize_document(str(path), "extractive", OnePageDeadline())
+    assert "read 1 of 2 pages" in truncated["degraded"]["source_text"]
+    assert not os.path.exists(tmp_path / "cache" / "earnings_summary")
+
+    # A later request with enough time reads the whole document
+    complete = summarize_document(str(path), "extractive", Deadline(60))
+    assert "degraded" not in complete
+    assert len(os.listdir(tmp_path / "cache" / "earnings_summary")) == 1
+
+
+def test_cached_summary_takes_period_from_new_file_name(tmp_path, monkeypatch):
+    from tools import result_cache
+    from tools.earnings_summarizer import summarize_document
+
+    monkeypatch.setattr(result_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(result_cache, "_memory", OrderedDict())
+
+    text = "Revenue grew 12% driven by strong demand. Supply chain challenges persist."
+    first = tmp_path / "transcript.txt"
+    first.write_text(text, encoding="utf-8")
+    renamed = tmp_path / "acme_q3_2024.txt"
+    renamed.write_text(text, encoding="utf-8")
+    header = tmp_path / "call.txt"
+    header.write_text("Q2 FY25 earnings call. " + text, encoding="utf-8")
+
+    assert summarize_document(str(first))["period"] == "Unknown"
+    # Same content, served from the cache, but the name now carries the quarter
+    summary = summarize_document(str(renamed))
+    assert summary["period"] == "Q3 2024"
+    assert summary["source_files"] == ["acme_q3_2024.txt"]
+    assert len(os.listdir(tmp_path / "cache" / "earnings_summary")) == 1
+
+    # Periods found in the text survive the cache
+    assert summarize_document(str(header))["period"] == "Q2 2025"
+    assert summarize_document(str(header))["period"] == "Q2 2025"
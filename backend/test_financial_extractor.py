@@ -0,0 +1,178 @@
+"""
+Financial Extractor Tests (pattern matching / numeric matrix, no LLM calls)
+
+Run: python -m pytest test_financial_extractor.py
+"""
+
+import math
+from collections import OrderedDict
+
+import pandas as pd
+
+from tools import result_cache
+from tools.financial_extractor import (
+    build_line_item_matrix,
+    compute_derived_metrics,
+    detect_unit_scale,
+    extract_financial_data,
+    extract_financial_data_from_pages,
+    locate_statement_pages,
+    parse_amounts,
+)
+from tools.pdf_pages import PdfPages, content_stream_text
+
+
+def file_data(name, scale, items):
+    return {"Source File": name, "Unit Scale": scale, "Line Items": items}
+
+
+def test_parse_amounts():
+    parsed = parse_amounts(pd.Series(["1,23,456", "(678.2)", "Not Found", "", "1,245.5"]))
+    assert parsed[0] == 123456.0
+    assert parsed[1] == -678.2
+    assert math.isnan(parsed[2]) and math.isnan(parsed[3])
+    assert parsed[4] == 1245.5
+
+
+def test_detect_unit_scale():
+    assert detect_unit_scale("(All amounts in USD millions)") == ("million", 1e6)
+    assert detect_unit_scale("Rs. in Lakhs") == ("lakh", 1e5)
+    assert detect_unit_scale("(₹ in crores)") == ("crore", 1e7)
+    assert detect_unit_scale("Income statement") == ("units", 1.0)
+
+
+def test_matrix_normalizes_units_and_years():
+    matrix = build_line_item_matrix([
+        file_data("a.txt", 1e7, {"Total Revenue": {"FY 25": "1,200", "FY 24": "Not Found"}}),
+        file_data("b.txt", 1e5, {"Total Revenue": {"2025": "1,23,456"}}),
+    ])
+
+    assert list(matrix.columns) == [2025, 2024]
+    assert (matrix.dtypes == "float64").all()
+    assert matrix.loc[("a.txt", "Total Revenue"), 2025] == 1200 * 1e7
+    assert matrix.loc[("b.txt", "Total Revenue"), 2025] == 123456 * 1e5
+    assert math.isnan(matrix.loc[("a.txt", "Total Revenue"), 2024])
+
+
+def test_derived_metrics_across_batch():
+    items = {
+        "Total Revenue": {"FY 25": "1,200", "FY 24": "1,000"},
+        "Other Income": {"FY 25": "50", "FY 24": "10"},
+        "Total Income": {"FY 25": "1,250", "FY 24": "1,100"},
+        "EBITDA": {"FY 25": "240", "FY 24": "Not Found"},
+        "PAT": {"FY 25": "120", "FY 24": "100"},
+    }
+    derived = compute_derived_metrics(build_line_item_matrix([file_data("a.txt", 1e7, items)]))
+    metrics = derived.loc["a.txt"]
+
+    assert metrics.loc["EBITDA Margin %", 2025] == 20.0
+    assert math.isnan(metrics.loc["EBITDA Margin %", 2024])
+    assert metrics.loc["PAT Margin %", 2024] == 10.0
+    assert round(metrics.loc["Revenue YoY Growth %", 2025], 6) == 20.0
+    assert metrics.loc["Income Check OK", 2025] == 1.0
+    assert metrics.loc["Income Check OK", 2024] == 0.0
+
+
+NARRATIVE_PAGE = (
+    "Our journey began in 1998. By 2030 we aim to double sales and net profit in new markets.\n"
+    "The board reviewed depreciation policies and employee costs at the 2019 annual meeting.\n"
+)
+STATEMENT_PAGE = (
+    "Statement of Profit and Loss (Rs. in crores)\n"
+    "Particulars                 FY 25      FY 24\n"
+    "Revenue from operations     12,345     11,000\n"
+    "Other income                   120         98\n"
+    "Total income                12,465     11,098\n"
+    "Finance costs                   45         40\n"
+    "Depreciation                   300        280\n"
+    "Profit before tax            2,000      1,800\n"
+    "Tax expense                    500        450\n"
+    "Profit after tax             1,500      1,350\n"
+)
+
+
+def test_locate_statement_pages_skips_narrative():
+    pages = [NARRATIVE_PAGE, NARRATIVE_PAGE, STATEMENT_PAGE, NARRATIVE_PAGE]
+    assert locate_statement_pages(pages) == [2]
+    assert locate_statement_pages(["Chairman's letter", "Notice of the annual meeting"]) == []
+
+
+def test_extraction_uses_statement_pages_only():
+    pages = [NARRATIVE_PAGE, STATEMENT_PAGE, NARRATIVE_PAGE]
+    data = extract_financial_data_from_pages(pages)
+
+    assert data["Statement Pages"] == [2]
+    # Years mentioned only in the narrative don't become columns
+    assert data["Years"] == ["FY 25", "FY 24"]
+
+
+def make_pdf(pages):
+    """
+    Minimal PDF, one text line per page line (Helvetica, no compression)
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_text in pages:
+        lines = [line.replace("(", "\\(").replace(")", "\\)") for line in page_text.splitlines()]
+        stream = "BT /F1 9 Tf 40 800 Td " + " 0 -11 Td ".join(f"({line}) Tj" for line in lines) + " ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream.encode("latin-1")))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R >> >> >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+def test_content_stream_text_groups_lines_by_baseline():
+    stream = b"BT 1 0 0 1 40 700 Tm (Revenue) Tj 1 0 0 1 300 700 Tm [(12,)-20(345)] TJ 0 -12 Td (Other\\051) Tj ET"
+    assert content_stream_text(stream) == "Revenue 12,345\nOther)"
+
+
+def test_pdf_extracts_statement_pages_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(result_cache, "_memory", OrderedDict())
+    report = tmp_path / "report.pdf"
+    report.write_bytes(make_pdf([NARRATIVE_PAGE, NARRATIVE_PAGE, STATEMENT_PAGE, NARRATIVE_PAGE]))
+
+    data = extract_financial_data_from_pages(PdfPages(str(report)))
+    assert data["Statement Pages"] == [3]
+    assert data["Years"] == ["FY 25", "FY 24"]
+    # Located on the content streams - only the statement page was extracted
+    cached = result_cache.load_result("pdf_pages", result_cache.file_digest(str(report)))
+    assert list(cached) == ["2"]
+    assert "Revenue from operations" in cached["2"]
+
+
+def test_only_complete_workbooks_are_marked_complete(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    report = tmp_path / "report.txt"
+    report.write_text(STATEMENT_PAGE * 3, encoding="utf-8")
+    empty = tmp_path / "empty.txt"
+    empty.write_text("", encoding="utf-8")
+
+    output_file, complete = extract_financial_data([str(report)], str(tmp_path / "out.xlsx"))
+    assert complete and output_file.endswith("out.xlsx")
+
+    # Nothing extracted - the error workbook must not be cached
+    _, complete = extract_financial_data([str(empty)], str(tmp_path / "error.xlsx"))
+    assert not complete
+
+    # Pattern matching found little and the LLM fallback failed - retry next time
+    from tools import financial_extractor
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(financial_extractor, "use_llm_fallback", lambda *args: {})
+    narrative = tmp_path / "narrative.txt"
+    narrative.write_text("Letter to shareholders, 2024. " + "We thank our customers and employees. " * 10,
+                         encoding="utf-8")
+    _, complete = extract_financial_data([str(narrative)], str(tmp_path / "partial.xlsx"))
+    assert not complete
@@ -0,0 +1,68 @@
+"""
+ETag / Compression Tests
+
+Run: python -m pytest test_http_cache.py
+"""
+
+import gzip
+import json
+
+from starlette.requests import Request
+
+import http_cache
+
+
+def make_request(headers):
+    scope = {
+        "type": "http",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    return Request(scope)
+
+
+def test_etag_changes_with_document_content(tmp_path):
+    doc = tmp_path / "call.txt"
+    doc.write_text("Q1 transcript")
+    first = http_cache.result_etag("earnings_summary", [str(doc)])
+
+    assert http_cache.result_etag("earnings_summary", [str(doc)]) == first
+    assert http_cache.result_etag("earnings_comparison", [str(doc)]) != first
+
+    doc.write_text("Q1 transcript, revised")
+    assert http_cache.result_etag("earnings_summary", [str(doc)]) != first
+
+
+def test_etag_changes_with_file_name(tmp_path):
+    # Results list source file names, so a renamed upload is a different result
+    first = tmp_path / "acme_q1_2024.txt"
+    second = tmp_path / "globex_q3_2025.txt"
+    first.write_text("Q1 transcript")
+    second.write_text("Q1 transcript")
+    assert http_cache.result_etag("earnings_summary", [str(first)]) != \
+        http_cache.result_etag("earnings_summary", [str(second)])
+
+
+def test_if_none_match():
+    etag = '"abc123"'
+    assert http_cache.matches(make_request({"If-None-Match": '"xyz", W/"abc123"'}), etag)
+    assert http_cache.matches(make_request({"If-None-Match": "*"}), etag)
+    assert not http_cache.matches(make_request({"If-None-Match": '"xyz"'}), etag)
+    assert not http_cache.matches(make_request({}), etag)
+
+
+def test_large_json_is_gzipped(monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", None)
+    payload = {"key_positives": ["Revenue grew 15% year-over-year"] * 100}
+
+    response = http_cache.json_response(make_request({"Accept-Encoding": "gzip"}), payload, '"e1"')
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"e1"'
+    assert json.loads(gzip.decompress(response.body)) == payload
+
+
+def test_incomplete_results_are_not_cacheable():
+    assert not http_cache.is_cacheable({"key_positives": ["Error extracting information"]})
+    assert not http_cache.is_cacheable({"error": "Could not extract text"})
+    assert not http_cache.is_cacheable({"answer": "Not available", "degraded": {"answer": "timed out"}})
+    assert http_cache.is_cacheable({"key_positives": ["Revenue grew"]})
@@ -0,0 +1,43 @@
+"""
+Load Test Harness Smoke Test (offline, a few seconds)
+
+Run: python -m pytest test_loadtest.py
+"""
+
+from loadtest import check_gates, percentile, run_load_test
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 95) == 10
+    assert percentile([], 99) == 0.0
+
+
+def test_small_run_reports_every_endpoint(monkeypatch, tmp_path):
+    import os
+    import tempfile
+
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    monkeypatch.setenv("OPENAI_API_KEY", "real-key")
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    report = run_load_test(
+        concurrency=2,
+        requests=12,
+        mix="upload=1,files=1,extraction=1,summary=1",
+        llm_latency=0.01,
+        llm_jitter=0.0,
+    )
+
+    assert report["total_requests"] == 12
+    assert report["llm_calls"] > 0
+    for stats in report["endpoints"].values():
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+    assert check_gates(report, max_error_rate=0.0) == []
+    assert check_gates(report, max_p95_ms=0.0) != []
+
+    # The mock settings and the work directory don't outlive the run
+    assert "OPENAI_BASE_URL" not in os.environ
+    assert os.environ["OPENAI_API_KEY"] == "real-key"
+    assert os.listdir(tmp_path) == []
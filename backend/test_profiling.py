@@ -0,0 +1,78 @@
+"""
+Profiling Tests
+
+Run: python -m pytest test_profiling.py
+"""
+
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import profiling
+
+
+def make_request(headers=None, query=""):
+    return Request({
+        "type": "http",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+        "query_string": query.encode(),
+    })
+
+
+def busy_work():
+    deadline = time.monotonic() + 0.05
+    total = 0
+    while time.monotonic() < deadline:
+        total += sum(range(1000))
+    return total
+
+
+def test_profile_path_rejects_bad_ids():
+    for profile_id in ("../../etc/passwd", "ABCDEF123456", "abc", ""):
+        with pytest.raises(ValueError):
+            profiling.profile_path(profile_id, "prof")
+    assert profiling.profile_path("0123456789ab", "prof").endswith("0123456789ab.prof")
+
+
+def test_is_admin_requires_matching_token(monkeypatch):
+    monkeypatch.delenv("PROFILING_TOKEN", raising=False)
+    assert not profiling.is_admin(make_request({"X-Profile-Token": "anything"}))
+
+    monkeypatch.setenv("PROFILING_TOKEN", "secret")
+    assert not profiling.is_admin(make_request())
+    assert not profiling.is_admin(make_request({"X-Profile-Token": "wrong"}))
+    assert profiling.is_admin(make_request({"X-Profile-Token": "secret"}))
+    # Never from the URL
+    assert not profiling.is_admin(make_request(query="profile=secret"))
+
+
+def test_profiled_call_is_saved_and_rendered(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "SAMPLE_INTERVAL", 0.001)
+
+    assert profiling.profiled(busy_work, "0123456789ab")() > 0
+
+    assert os.path.exists(tmp_path / "0123456789ab.prof")
+    with open(tmp_path / "0123456789ab.folded", encoding="utf-8") as f:
+        assert "busy_work" in f.read()
+
+    assert "busy_work" in profiling.stats_text("0123456789ab")
+    svg = profiling.flamegraph_svg("0123456789ab")
+    assert svg.startswith("<svg") and "busy_work" in svg
+    assert [p["profile_id"] for p in profiling.list_profiles()] == ["0123456789ab"]
+
+
+def test_profile_download_requires_token(tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILING_TOKEN", "secret")
+    client = TestClient(main.app)
+
+    assert client.get("/profiles/0123456789ab").status_code == 403
+    assert client.get("/profiles").status_code == 403
+    response = client.get("/profiles/0123456789ab", headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 404
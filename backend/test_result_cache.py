@@ -0,0 +1,25 @@
+"""
+Result Cache Tests
+
+Run: python -m pytest test_result_cache.py
+"""
+
+from collections import OrderedDict
+
+from tools import result_cache
+
+
+def test_memory_keeps_most_recently_used_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(result_cache, "_memory", OrderedDict())
+    monkeypatch.setattr(result_cache, "MAX_MEMORY_ENTRIES", 2)
+
+    result_cache.save_result("pages", "a", [1])
+    result_cache.save_result("pages", "b", [2])
+    assert result_cache.load_result("pages", "a") == [1]
+    result_cache.save_result("pages", "c", [3])
+
+    # "b" was least recently used - dropped from memory, still on disk
+    assert list(result_cache._memory) == ["pages/a", "pages/c"]
+    assert result_cache.load_result("pages", "b") == [2]
+    assert len(result_cache._memory) == 2
@@ -0,0 +1,77 @@
+"""
+Passage Retrieval Tests (no LLM calls)
+
+Run: python -m pytest test_retrieval.py
+"""
+
+import os
+
+from tools import retrieval
+from tools.retrieval import PassageIndex, count_matrix, split_passages
+
+
+def make_index(documents):
+    built = []
+    for name, text in documents.items():
+        passages = split_passages(text)
+        built.append((name, passages, count_matrix(passages)))
+    return PassageIndex(built)
+
+
+def test_split_passages_keeps_offsets_and_overlap():
+    text = " ".join(f"word{i}" for i in range(300))
+    passages = split_passages(text)
+
+    assert len(passages) == 3
+    for passage in passages:
+        assert text[passage["start"]:passage["end"]] == passage["text"]
+    # Consecutive windows overlap
+    assert passages[1]["start"] < passages[0]["end"]
+
+
+def test_search_ranks_matching_passage_first():
+    index = make_index({
+        "call.txt": "Operating margins improved to 20.5% on a favorable product mix.",
+        "report.txt": "Revenue from operations was 1,200 crores. Employee expenses rose.",
+    })
+    hits = index.search("What did they say about margins?", top_k=2)
+
+    assert hits[0]["source_file"] == "call.txt"
+    assert all(hit["source_file"] != "report.txt" for hit in hits)
+
+
+def test_no_matching_passages_skips_llm(monkeypatch, tmp_path):
+    def fail():
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(retrieval, "get_openai_client", fail)
+    monkeypatch.setattr(retrieval, "CACHE_DIR", str(tmp_path / "cache"))
+    doc = tmp_path / "call.txt"
+    doc.write_text("Revenue grew 15% year-over-year.")
+
+    result = retrieval.answer_question([str(doc)], "dividend policy?")
+    assert result == {"question": "dividend policy?", "answer": "Not mentioned", "sources": []}
+
+
+def test_index_missing_a_document_is_not_reused(monkeypatch, tmp_path):
+    monkeypatch.setattr(retrieval, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(retrieval, "_current_index", None)
+    doc = tmp_path / "call.txt"
+    doc.write_text("The board approved a new dividend policy.")
+
+    build_document_index = retrieval.build_document_index
+
+    def unreadable(file_path):
+        raise ValueError("half-written index")
+
+    monkeypatch.setattr(retrieval, "build_document_index", unreadable)
+    assert retrieval.build_index([str(doc)]).search("dividend policy", top_k=1) == []
+
+    # The next question retries the document instead of reusing the incomplete index
+    monkeypatch.setattr(retrieval, "build_document_index", build_document_index)
+    hits = retrieval.build_index([str(doc)]).search("dividend policy", top_k=1)
+    assert hits[0]["source_file"] == "call.txt"
+    # Only the finished pair is left on disk
+    assert sorted(os.listdir(tmp_path / "cache" / "retrieval")) == [
+        f"v{retrieval.INDEX_VERSION}-{retrieval.file_digest(str(doc))}.{ext}" for ext in ("json", "npz")
+    ]
@@ -0,0 +1,65 @@
+"""
+Startup Import-Time Test
+
+Fails if importing main.py gets slow again or starts pulling in the heavy
+tool dependencies (pandas, PyPDF2, OpenAI, NumPy, SciPy) before the first request.
+Run: python -m pytest test_startup.py
+
+Budget can be overridden with STARTUP_IMPORT_BUDGET_MS.
+"""
+
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORT_BUDGET_MS = int(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+HEAVY_MODULES = ["pandas", "PyPDF2", "openai", "openpyxl", "numpy", "scipy"]
+
+
+def measure_import_main():
+    """
+    Import main in a fresh interpreter with -X importtime
+    Returns (total import time in ms, set of imported top-level modules)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PREWARM_TOOLS": "0"},
+    )
+    assert result.returncode == 0, result.stderr
+
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        total_us += int(self_us)
+        modules.add(name.strip().split(".")[0])
+    return total_us / 1000, modules
+
+
+def test_main_does_not_import_heavy_dependencies():
+    _, modules = measure_import_main()
+    loaded = [name for name in HEAVY_MODULES if name in modules]
+    assert not loaded, f"main.py imports heavy modules at startup: {loaded}"
+
+
+def test_main_import_time_within_budget():
+    total_ms, _ = measure_import_main()
+    assert total_ms < IMPORT_BUDGET_MS, (
+        f"Importing main took {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS} ms)"
+    )
+
+
+def test_tools_load_on_first_use():
+    from tools import get_tool
+
+    summarize = get_tool("earnings_summary")
+    assert summarize.__name__ == "summarize_earnings_call"
+    assert get_tool("earnings_summary") is summarize
@@ -1 +1,69 @@
 # Tools package
+#
+# Tool registry - main.py looks tools up here instead of importing the tool
+# modules directly. Each tool module pulls in pandas / PyPDF2 / OpenAI, so
+# they are only imported on first use (or by prewarm() once the server is up).
+
+import importlib
+import threading
+from typing import Callable, Dict
+
+# tool name -> "module:function"
+TOOLS = {
+    "financial_extraction": "tools.financial_extractor:extract_financial_data",
+    "earnings_summary": "tools.earnings_summarizer:summarize_earnings_call",
+    "earnings_comparison": "tools.earnings_summarizer:compare_earnings_calls",
+    "document_index": "tools.retrieval:build_document_index",
+    "ask": "tools.retrieval:answer_question",
+}
+
+# Bump a tool's version when its output changes - cached results and ETags
+# for the old version stop matching
+TOOL_VERSIONS = {
+    "financial_extraction": "4",
+    "earnings_summary": "4",
+    "earnings_comparison": "4",
+}
+
+_loaded: Dict[str, Callable] = {}
+_lock = threading.Lock()
+
+
+def get_tool(name: str) -> Callable:
+    """
+    Return the entry function for a tool, importing its module on first use
+    """
+    func = _loaded.get(name)
+    if func is not None:
+        return func
+
+    if name not in TOOLS:
+        raise KeyError(f"Unknown tool: {name}")
+
+    with _lock:
+        if name not in _loaded:
+            module_name, func_name = TOOLS[name].split(":")
+            module = importlib.import_module(module_name)
+            _loaded[name] = getattr(module, func_name)
+    return _loaded[name]
+
+
+def prewarm() -> None:
+    """
+    Import every registered tool so the first real request doesn't pay for it
+    Errors are printed, not raised - the tool will retry on first use
+    """
+    for name in TOOLS:
+        try:
+            get_tool(name)
+        except Exception as e:
+            print(f"Error pre-warming tool {name}: {e}")
+
+
+def prewarm_in_background() -> threading.Thread:
+    """
+    Run prewarm() in a daemon thread
+    """
+    thread = threading.Thread(target=prewarm, name="tool-prewarm", daemon=True)
+    thread.start()
+    return thread
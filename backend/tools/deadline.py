@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# Default time budget for one tool request (seconds); override per request
+# with the X-Deadline-Ms header or ?deadline_ms= query parameter
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("TOOL_DEADLINE_SECONDS", "60"))
+
+# Don't start an LLM call with less time than this left
+MIN_LLM_SECONDS = 1.0
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised by a stage that ran out of time budget
+    """
+
+
+class Deadline:
+    """
+    Time budget for one tool request, passed down to every parsing stage and
+    LLM call. Stages that give up record why in `degraded` (field -> reason),
+    so the request can return what it already has instead of an error.
+    """
+
+    def __init__(self, seconds: float = DEFAULT_DEADLINE_SECONDS):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.degraded: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def llm_timeout(self) -> Optional[float]:
+        """
+        Timeout for the next LLM call, or None if there isn't enough time to make one
+        """
+        remaining = self.remaining()
+        return remaining if remaining >= MIN_LLM_SECONDS else None
+
+    def mark_degraded(self, field: str, reason: str) -> None:
+        with self._lock:
+            self.degraded.setdefault(field, reason)
+
+
+def llm_client_for(client, deadline: Optional[Deadline], stage: str):
+    """
+    Client bound to the time left on the deadline (no retries, they wouldn't fit)
+    Raises DeadlineExceeded if there is no time left for the call
+    """
+    if deadline is None:
+        return client
+    timeout = deadline.llm_timeout()
+    if timeout is None:
+        raise DeadlineExceeded(f"{stage}: not enough time left for an LLM call")
+    return client.with_options(timeout=timeout, max_retries=0)
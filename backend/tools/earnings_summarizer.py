@@ -1,8 +1,13 @@
 import os
 import re
+import threading
 from openai import OpenAI
 from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from PyPDF2 import PdfReader
+from tools.deadline import Deadline, DeadlineExceeded, llm_client_for
+from tools.result_cache import file_digest, load_result, save_result
 
 # Don't initialize client globally - do it when needed
 _client = None
@@ -25,26 +30,34 @@ def get_openai_client():
     return _client
 
 
-def extract_text_from_pdf(file_path: str) -> str:
+def extract_text_from_pdf(file_path: str, deadline: Deadline = None, degraded: Dict[str, str] = None) -> str:
     """
     Extract text from PDF file
+    Stops at the page where the deadline runs out and keeps what it has
+    (recorded as "source_text" on the deadline and in degraded, if given)
     """
     try:
         reader = PdfReader(file_path)
         text = ""
-        for page in reader.pages:
+        for page_number, page in enumerate(reader.pages):
+            if deadline is not None and deadline.expired:
+                reason = f"{os.path.basename(file_path)}: read {page_number} of {len(reader.pages)} pages before the deadline"
+                deadline.mark_degraded("source_text", reason)
+                if degraded is not None:
+                    degraded["source_text"] = reason
+                break
             text += page.extract_text() + "\n"
         return text
     except Exception as e:
         raise Exception(f"Could not extract text from PDF: {str(e)}")
 
 
-def extract_text_from_file(file_path: str) -> str:
+def extract_text_from_file(file_path: str, deadline: Deadline = None, degraded: Dict[str, str] = None) -> str:
     """
     Extract text based on file type
     """
     if file_path.endswith('.pdf'):
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(file_path, deadline, degraded)
     elif file_path.endswith('.txt'):
         with open(file_path, 'r', encoding='utf-8') as f:
             return f.read()
@@ -52,6 +65,13 @@ def extract_text_from_file(file_path: str) -> str:
         raise Exception(f"Unsupported file type: {file_path}")
 
 
+# Sentiment lexicon (also used to classify sentences in extractive mode)
+POSITIVE_KEYWORDS = ["growth", "strong", "increase", "improved", "optimistic", "positive", 
+                     "expansion", "opportunity", "success", "excellent", "robust", "momentum"]
+NEGATIVE_KEYWORDS = ["decline", "weak", "decrease", "challenging", "concern", "risk", 
+                     "difficult", "pressure", "uncertainty", "cautious", "headwind"]
+
+
 def analyze_sentiment_basic(text: str) -> tuple:
     """
     Basic sentiment analysis using keywords
@@ -59,15 +79,9 @@ def analyze_sentiment_basic(text: str) -> tuple:
     """
     text_lower = text.lower()
     
-    # Keyword lists
-    positive_keywords = ["growth", "strong", "increase", "improved", "optimistic", "positive", 
-                        "expansion", "opportunity", "success", "excellent", "robust", "momentum"]
-    negative_keywords = ["decline", "weak", "decrease", "challenging", "concern", "risk", 
-                        "difficult", "pressure", "uncertainty", "cautious", "headwind"]
-    
     # Count keywords
-    positive_count = sum(1 for keyword in positive_keywords if keyword in text_lower)
-    negative_count = sum(1 for keyword in negative_keywords if keyword in text_lower)
+    positive_count = sum(1 for keyword in POSITIVE_KEYWORDS if keyword in text_lower)
+    negative_count = sum(1 for keyword in NEGATIVE_KEYWORDS if keyword in text_lower)
     
     # Determine tone
     if positive_count > negative_count * 1.5:
@@ -96,14 +110,15 @@ def analyze_sentiment_basic(text: str) -> tuple:
     return tone, confidence
 
 
-def extract_key_points_with_llm(text: str, section_type: str) -> List[str]:
+def extract_key_points_with_llm(text: str, section_type: str, deadline: Deadline = None) -> List[str]:
     """
     Use LLM to extract key points
     section_type: 'positives', 'concerns', or 'initiatives'
+    Raises DeadlineExceeded if the call doesn't fit in the deadline
     """
     try:
-        # Get OpenAI client (only when needed)
-        client = get_openai_client()
+        # Get OpenAI client (only when needed), bounded by the time left
+        client = llm_client_for(get_openai_client(), deadline, section_type)
         
         if section_type == "positives":
             instruction = "Extract 3-5 key positive highlights or achievements mentioned by management. Focus on facts, not opinions."
@@ -145,34 +160,85 @@ Do NOT make up information. Only extract what is clearly stated.
         
         return points if isinstance(points, list) else []
     
+    except DeadlineExceeded:
+        raise
     except Exception as e:
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceeded(f"{section_type}: LLM call timed out") from e
         print(f"Error extracting {section_type}: {e}")
         return ["Error extracting information"]
 
 
-def extract_forward_guidance(text: str) -> str:
+# Sentence segmenter: a sentence ends at . ! ? followed by whitespace, at a blank line
+# or at the end of the text (so "20.5%" and "$178.4 million" don't split a sentence)
+# Single line breaks are just whitespace - PDF text wraps sentences across lines
+SENTENCE_PATTERN = re.compile(r'\S(?:[^\n]|\n(?![ \t]*\n))*?(?:[.!?]+(?=\s|\Z)|(?=\n[ \t]*\n)|(?=\s*\Z))')
+
+# "up" / "down" only count before a figure ("up 5%", "down to 70%") - otherwise
+# "set up", "follow up" and "wound down" read as trends
+MOVE_TO_FIGURE = r"(?=\s+(?:to\s+|by\s+|from\s+)?[$₹]?\d)"
+
+# Signal terms for the sentence scanner - one named group per signal
+SIGNAL_PATTERNS = {
+    "capacity": r"capacit\w*|utili[sz]ation|production|manufactur\w*|output",
+    "guidance": r"guidance|outlook|forecast\w*|expect\w*|anticipat\w*|project(?:ed|ing|ions?)",
+    "increase": r"increas\w*|higher|grow\w*|ris(?:e|es|ing)|improv\w*|ramp\w*|up" + MOVE_TO_FIGURE,
+    "decrease": r"decreas\w*|lower\w*|declin\w*|reduc\w*|fall\w*|fell|down" + MOVE_TO_FIGURE,
+    "stable": r"stable|maintain\w*|steady|flat|unchanged",
+}
+SIGNAL_PATTERN = re.compile(
+    r"\b(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in SIGNAL_PATTERNS.items()) + r")\b",
+    re.IGNORECASE
+)
+
+
+def scan_signal_sentences(text: str) -> List[Dict[str, Any]]:
     """
-    Extract forward guidance using simple pattern matching + LLM
+    Split text into sentences and tag each one with the signals it contains
+    Single pass over the text - every later check works on this list
+    Returns only sentences with at least one signal:
+    [{"text": ..., "start": ..., "end": ..., "signals": ["capacity", "increase"]}, ...]
     """
-    text_lower = text.lower()
-    
-    # Look for guidance keywords
-    guidance_keywords = ["guidance", "outlook", "forecast", "expect", "anticipate", "project"]
+    sentences = []
+    for sentence_match in SENTENCE_PATTERN.finditer(text):
+        sentence = sentence_match.group(0)
+        signals = {match.lastgroup for match in SIGNAL_PATTERN.finditer(sentence)}
+        if signals:
+            sentences.append({
+                "text": sentence,
+                "start": sentence_match.start(),
+                "end": sentence_match.end(),
+                "signals": sorted(signals)
+            })
+    return sentences
+
+
+def extract_forward_guidance(text: str, sentences: List[Dict[str, Any]] = None,
+                             deadline: Deadline = None) -> str:
+    """
+    Extract forward guidance using the sentence scanner + LLM
+    The LLM only sees the sentences that mention guidance, and is only
+    called when there are any
+    Raises DeadlineExceeded if the call doesn't fit in the deadline
+    """
+    if sentences is None:
+        sentences = scan_signal_sentences(text)
     
-    has_guidance = any(keyword in text_lower for keyword in guidance_keywords)
+    candidates = [s["text"] for s in sentences if "guidance" in s["signals"]]
     
-    if not has_guidance:
+    if not candidates:
         return "Not mentioned"
     
     # Use LLM to extract specific guidance
     try:
-        # Get OpenAI client (only when needed)
-        client = get_openai_client()
+        # Get OpenAI client (only when needed), bounded by the time left
+        client = llm_client_for(get_openai_client(), deadline, "guidance")
         
-        prompt = f"""You are analyzing an earnings call transcript.
+        excerpt = "\n".join(candidates)
+        prompt = f"""You are analyzing sentences from an earnings call transcript.
 
-Text:
-{text[:3000]}
+Sentences:
+{excerpt[:3000]}
 
 Task: Extract any forward-looking guidance mentioned by management (revenue targets, earnings forecasts, growth rates, etc.)
 
@@ -191,48 +257,254 @@ Do NOT make up numbers or forecasts.
         guidance = response.choices[0].message.content.strip()
         return guidance if guidance else "Not mentioned"
     
+    except DeadlineExceeded:
+        raise
     except Exception as e:
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceeded("guidance: LLM call timed out") from e
         print(f"Error extracting guidance: {e}")
         return "Not mentioned"
 
 
-def extract_capacity_utilization(text: str) -> str:
+def extract_capacity_utilization(text: str, sentences: List[Dict[str, Any]] = None) -> str:
     """
     Extract capacity utilization trends
+    A trend only counts when it is in the same sentence as a capacity term
     """
-    text_lower = text.lower()
+    if sentences is None:
+        sentences = scan_signal_sentences(text)
     
-    # Keywords related to capacity
-    capacity_keywords = ["capacity", "utilization", "production", "manufacturing", "output"]
+    capacity_sentences = [s for s in sentences if "capacity" in s["signals"]]
     
-    has_capacity_info = any(keyword in text_lower for keyword in capacity_keywords)
-    
-    if not has_capacity_info:
+    if not capacity_sentences:
         return "Not mentioned"
     
-    # Simple pattern matching for trends
-    if "increas" in text_lower and any(kw in text_lower for kw in capacity_keywords):
+    # Count sentences per trend (order breaks ties)
+    trends = ["increase", "decrease", "stable"]
+    counts = {trend: sum(1 for s in capacity_sentences if trend in s["signals"]) for trend in trends}
+    best = max(trends, key=lambda trend: counts[trend])
+    
+    if counts[best] == 0:
+        return "Capacity discussed but trend unclear"
+    elif best == "increase":
         return "Increasing capacity utilization mentioned"
-    elif "decreas" in text_lower and any(kw in text_lower for kw in capacity_keywords):
+    elif best == "decrease":
         return "Decreasing capacity utilization mentioned"
-    elif "stable" in text_lower or "maintain" in text_lower:
+    else:
         return "Stable capacity utilization mentioned"
+
+
+# Extractive mode: growth-initiative cues and words ignored when comparing sentences
+INITIATIVE_KEYWORDS = ["launch", "expan", "invest", "acqui", "new market", "new product", "initiative",
+                       "strategic", "r&d", "pipeline", "opened", "plan to", "partnership", "capex"]
+
+EXTRACTIVE_STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "with", "that", "this", "from", "have", "has", "had",
+    "our", "we're", "its", "it's", "you", "your", "they", "their", "been", "which", "will", "would",
+    "about", "into", "also", "all", "but", "not", "than", "there", "what", "can", "some", "more"
+}
+
+# Caps the sentence-similarity matrix (MAX x MAX floats)
+MAX_RANKED_SENTENCES = 1500
+
+SPEAKER_PREFIX = re.compile(r"^(?:[QA]:|[A-Z][\w.]*(?: [A-Z][\w.]*){0,3}:)\s*")
+
+
+def rank_sentences(sentences: List[str], damping: float = 0.85, iterations: int = 50) -> np.ndarray:
+    """
+    TextRank: PageRank over the sentence cosine-similarity graph
+    Returns one centrality score per sentence
+    """
+    count = len(sentences)
+    if count == 0:
+        return np.zeros(0)
+    
+    # Term-frequency matrix (sentences x vocabulary)
+    vocabulary = {}
+    rows, cols = [], []
+    for row, sentence in enumerate(sentences):
+        for word in re.findall(r"[a-z][a-z&']{2,}", sentence.lower()):
+            if word not in EXTRACTIVE_STOPWORDS:
+                rows.append(row)
+                cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    
+    tf = np.zeros((count, max(len(vocabulary), 1)))
+    np.add.at(tf, (rows, cols), 1.0)
+    norms = np.linalg.norm(tf, axis=1, keepdims=True)
+    unit = tf / np.where(norms == 0, 1.0, norms)
+    
+    similarity = unit @ unit.T
+    np.fill_diagonal(similarity, 0.0)
+    
+    # Row-normalise into transition probabilities (isolated sentences jump uniformly)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.where(out_weight > 0, similarity / np.where(out_weight == 0, 1.0, out_weight), 1.0 / count)
+    
+    scores = np.full(count, 1.0 / count)
+    for _ in range(iterations):
+        updated = (1 - damping) / count + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-8:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+
+def extract_key_points_extractive(text: str) -> Dict[str, List[str]]:
+    """
+    Offline alternative to extract_key_points_with_llm
+    Picks the most central sentences (TextRank) and sorts them into
+    positives / concerns / initiatives with the sentiment lexicon
+    """
+    # Only sentences that hit the lexicon can be picked, so only those are ranked
+    candidates = []
+    for match in SENTENCE_PATTERN.finditer(text):
+        sentence = " ".join(SPEAKER_PREFIX.sub("", match.group(0)).split())
+        # Skip questions, headings and fragments
+        if sentence.endswith("?") or sentence.endswith(":") or len(sentence.split()) < 6:
+            continue
+        lower = sentence.lower()
+        hits = (
+            sum(1 for keyword in POSITIVE_KEYWORDS if keyword in lower),
+            sum(1 for keyword in NEGATIVE_KEYWORDS if keyword in lower),
+            sum(1 for keyword in INITIATIVE_KEYWORDS if keyword in lower)
+        )
+        if any(hits):
+            candidates.append((sentence, hits))
+        if len(candidates) >= MAX_RANKED_SENTENCES:
+            break
+    
+    scores = rank_sentences([sentence for sentence, _ in candidates])
+    
+    positives, concerns, initiatives = [], [], []
+    for index in np.argsort(-scores, kind="stable"):
+        sentence, (positive_hits, negative_hits, initiative_hits) = candidates[index]
+        
+        if initiative_hits and len(initiatives) < 3:
+            initiatives.append(sentence)
+        elif negative_hits > positive_hits and len(concerns) < 5:
+            concerns.append(sentence)
+        elif positive_hits > negative_hits and len(positives) < 5:
+            positives.append(sentence)
+    
+    return {
+        "positives": positives or ["Not mentioned"],
+        "concerns": concerns or ["Not mentioned"],
+        "initiatives": initiatives or ["Not mentioned"]
+    }
+
+
+def extract_guidance_extractive(sentences: List[Dict[str, Any]]) -> str:
+    """
+    Offline guidance: the guidance sentences that contain figures, else the first one
+    """
+    candidates = [" ".join(s["text"].split()) for s in sentences if "guidance" in s["signals"]]
+    if not candidates:
+        return "Not mentioned"
+    with_figures = [c for c in candidates if re.search(r"\d", c)]
+    return " ".join((with_figures or candidates)[:2])
+
+
+def effective_mode(mode: str) -> str:
+    """
+    The summary mode that will actually run: LLM mode needs an OpenAI key
+    """
+    if mode == "llm" and not os.getenv("OPENAI_API_KEY"):
+        return "extractive"
+    return mode
+
+
+def summarize_text(text: str, source_files: List[str], mode: str = "llm",
+                   deadline: Deadline = None) -> Dict[str, Any]:
+    """
+    Build the structured summary for one block of transcript text
+    mode: "llm" (OpenAI for key points and guidance) or "extractive" (local, no network)
+    LLM mode falls back to extractive when no OpenAI key is configured
+    An LLM field that misses the deadline gets the extractive result instead,
+    and is listed under "degraded" (field -> reason)
+    """
+    mode = effective_mode(mode)
+    
+    # Analyze sentiment
+    tone, confidence = analyze_sentiment_basic(text)
+    
+    # Scan sentences once for guidance / capacity signals
+    sentences = scan_signal_sentences(text)
+    
+    degraded = {}
+    if mode == "extractive":
+        points = extract_key_points_extractive(text)
+        positives = points["positives"]
+        concerns = points["concerns"]
+        initiatives = points["initiatives"]
+        guidance = extract_guidance_extractive(sentences)
     else:
-        return "Capacity discussed but trend unclear"
+        extractive_points = None
+        
+        def key_points(field: str, section_type: str) -> List[str]:
+            nonlocal extractive_points
+            try:
+                return extract_key_points_with_llm(text, section_type, deadline)
+            except DeadlineExceeded as e:
+                degraded[field] = f"{e}; extractive result shown"
+                if extractive_points is None:
+                    extractive_points = extract_key_points_extractive(text)
+                return extractive_points[section_type]
+        
+        # Extract key points using LLM
+        positives = key_points("key_positives", "positives")
+        concerns = key_points("key_concerns", "concerns")
+        initiatives = key_points("growth_initiatives", "initiatives")
+        
+        # Extract guidance
+        try:
+            guidance = extract_forward_guidance(text, sentences, deadline)
+        except DeadlineExceeded as e:
+            degraded["forward_guidance"] = f"{e}; extractive result shown"
+            guidance = extract_guidance_extractive(sentences)
+    
+    # Extract capacity utilization
+    capacity = extract_capacity_utilization(text, sentences)
+    
+    # Build result
+    result = {
+        "source_files": source_files,
+        "summary_mode": mode,
+        "management_tone": tone,
+        "confidence_level": confidence,
+        "key_positives": positives[:5],  # Limit to 5
+        "key_concerns": concerns[:5],  # Limit to 5
+        "forward_guidance": guidance,
+        "capacity_utilization_trends": capacity,
+        "growth_initiatives": initiatives[:3]  # Limit to 3
+    }
+    
+    if degraded:
+        result["degraded"] = degraded
+        for field, reason in degraded.items():
+            deadline.mark_degraded(field, reason)
+    
+    return result
 
 
-def summarize_earnings_call(file_paths: List[str]) -> Dict[str, Any]:
+def summarize_earnings_call(file_paths: List[str], mode: str = "llm", deadline: Deadline = None) -> Dict[str, Any]:
     """
     Main function to summarize earnings call
+    mode: "llm" (default) or "extractive" (fast local preview, no network)
+    deadline: time budget for the whole request (LLM fields past it fall back to extractive)
     Returns structured JSON
     """
     # Combine text from all files
     combined_text = ""
     source_files = []
     
-    for file_path in file_paths:
+    for index, file_path in enumerate(file_paths):
+        if deadline is not None and deadline.expired:
+            skipped = ", ".join(os.path.basename(path) for path in file_paths[index:])
+            deadline.mark_degraded("source_files", f"Deadline exceeded before reading: {skipped}")
+            break
         try:
-            text = extract_text_from_file(file_path)
+            text = extract_text_from_file(file_path, deadline)
             combined_text += text + "\n\n"
             source_files.append(os.path.basename(file_path))
         except Exception as e:
@@ -244,30 +516,238 @@ def summarize_earnings_call(file_paths: List[str]) -> Dict[str, Any]:
             "source_files": source_files
         }
     
-    # Analyze sentiment
-    tone, confidence = analyze_sentiment_basic(combined_text)
+    result = summarize_text(combined_text, source_files, mode, deadline)
+    if deadline is not None and deadline.degraded:
+        result["degraded"] = dict(deadline.degraded)
+    return result
+
+
+# Bump when the per-document summary changes, to invalidate cached summaries
+SUMMARY_CACHE_VERSION = "5"
+
+# Q4 2023, Q4 FY24, Q1 FY'25, Q2-2024 ...
+PERIOD_PATTERN = re.compile(r"(?<![a-z0-9])Q([1-4])[\s_-]*(?:FY[\s_-]?'?)?((?:19|20)\d{2}|\d{2})(?!\d)", re.IGNORECASE)
+
+# Tone ordering for quarter-over-quarter direction
+TONE_SCALE = ["pessimistic", "cautious", "neutral", "cautiously optimistic", "optimistic"]
+
+# LLM-mode comparisons share one pool sized like the tool worker pool, so
+# concurrent comparisons don't multiply threads past TOOL_MAX_CONCURRENCY
+LLM_POOL_SIZE = int(os.getenv("TOOL_MAX_CONCURRENCY", "2"))
+_llm_pool = None
+_llm_pool_lock = threading.Lock()
+
+CONCERN_STOPWORDS = {"with", "from", "that", "this", "have", "been", "were", "their", "about",
+                     "some", "more", "than", "which", "over", "into", "across", "particularly"}
+
+
+def detect_period(file_name: str, text: str) -> str:
+    """
+    Find the quarter a transcript covers, e.g. "Q4 2023"
+    Looks at the file name first, then the start of the transcript
+    """
+    for source in (file_name, text[:1000]):
+        match = PERIOD_PATTERN.search(source)
+        if match:
+            quarter, year = match.groups()
+            if len(year) == 2:
+                year = f"20{year}"
+            return f"Q{quarter} {year}"
+    return "Unknown"
+
+
+def summarize_document(file_path: str, mode: str = "extractive", deadline: Deadline = None) -> Dict[str, Any]:
+    """
+    Summarize a single transcript, reusing the cached result for identical content
+    """
+    file_name = os.path.basename(file_path)
+    # Keyed by the mode that runs, so an extractive fallback is never stored as an LLM summary
+    cache_key = f"v{SUMMARY_CACHE_VERSION}-{effective_mode(mode)}-{file_digest(file_path)}"
     
-    # Extract key points using LLM
-    positives = extract_key_points_with_llm(combined_text, "positives")
-    concerns = extract_key_points_with_llm(combined_text, "concerns")
-    initiatives = extract_key_points_with_llm(combined_text, "initiatives")
+    # The cache holds the period found in the text; the file name (checked
+    # first) can differ between uploads of the same transcript
+    cached = load_result("earnings_summary", cache_key)
+    if cached is not None:
+        summary = {key: value for key, value in cached.items() if key != "text_period"}
+        summary["period"] = detect_period(file_name, "")
+        if summary["period"] == "Unknown":
+            summary["period"] = cached["text_period"]
+        return {**summary, "source_files": [file_name]}
     
-    # Extract guidance
-    guidance = extract_forward_guidance(combined_text)
+    # Set if the deadline cut this document's text short
+    source_degraded = {}
+    try:
+        text = extract_text_from_file(file_path, deadline, source_degraded)
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return {"error": f"Could not extract text: {e}", "source_files": [file_name], "period": "Unknown"}
     
-    # Extract capacity utilization
-    capacity = extract_capacity_utilization(combined_text)
+    if not text.strip():
+        return {"error": "No text extracted", "source_files": [file_name], "period": "Unknown"}
+    
+    summary = summarize_text(text, [file_name], mode, deadline)
+    summary["period"] = detect_period(file_name, text)
+    if source_degraded:
+        summary["degraded"] = {**source_degraded, **summary.get("degraded", {})}
+    
+    # Don't cache results where the LLM failed, the text was cut short or
+    # anything ran out of time - retry them next time
+    llm_failed = any(
+        "Error extracting information" in summary[field]
+        for field in ("key_positives", "key_concerns", "growth_initiatives")
+    )
+    if not llm_failed and "degraded" not in summary and summary["summary_mode"] == effective_mode(mode):
+        cache_entry = {key: value for key, value in summary.items() if key != "period"}
+        save_result("earnings_summary", cache_key, {**cache_entry, "text_period": detect_period("", text)})
+    
+    return summary
+
+
+def period_sort_key(period: str) -> tuple:
+    """
+    (year, quarter) for sorting; unknown periods sort last
+    """
+    match = re.match(r"Q([1-4]) (\d{4})", period)
+    if not match:
+        return (9999, 9)
+    return (int(match.group(2)), int(match.group(1)))
+
+
+def concern_keywords(concern: str) -> set:
+    """
+    Significant words of a concern, for matching concerns across quarters
+    """
+    words = re.findall(r"[a-z]{4,}", concern.lower())
+    return {word for word in words if word not in CONCERN_STOPWORDS}
+
+
+def find_recurring_concerns(quarters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group similar concerns across quarters; keep those raised in 2+ quarters
+    """
+    groups = []
+    for quarter in quarters:
+        for concern in quarter.get("key_concerns", []):
+            if concern in ("Not mentioned", "Error extracting information"):
+                continue
+            keywords = concern_keywords(concern)
+            if not keywords:
+                continue
+            
+            for group in groups:
+                overlap = len(keywords & group["keywords"]) / len(keywords | group["keywords"])
+                if overlap >= 0.25:
+                    group["keywords"] |= keywords
+                    if quarter["period"] not in group["periods"]:
+                        group["periods"].append(quarter["period"])
+                    break
+            else:
+                groups.append({"concern": concern, "keywords": keywords, "periods": [quarter["period"]]})
+    
+    return [
+        {"concern": group["concern"], "periods": group["periods"]}
+        for group in groups
+        if len(group["periods"]) >= 2
+    ]
+
+
+def get_llm_pool() -> ThreadPoolExecutor:
+    """
+    Shared pool for LLM-mode comparisons (lazy initialization)
+    """
+    global _llm_pool
+    with _llm_pool_lock:
+        if _llm_pool is None:
+            _llm_pool = ThreadPoolExecutor(max_workers=LLM_POOL_SIZE, thread_name_prefix="comparison-llm")
+    return _llm_pool
+
+
+def compare_earnings_calls(file_paths: List[str], mode: str = "extractive", deadline: Deadline = None) -> Dict[str, Any]:
+    """
+    Summarize each transcript separately (cached per document)
+    and compare them quarter over quarter
+    Bulk runs default to extractive mode; pass mode="llm" to refine with the LLM
+    All documents share one deadline
+    """
+    if not file_paths:
+        return {"error": "No files to compare", "source_files": []}
+    
+    def summarize(path: str) -> Dict[str, Any]:
+        return summarize_document(path, mode, deadline)
+    
+    # Extractive summaries are CPU-bound - run them on this tool worker.
+    # LLM calls mostly wait on the network, so they overlap on the shared pool
+    if mode == "llm" and len(file_paths) > 1:
+        summaries = list(get_llm_pool().map(summarize, file_paths))
+    else:
+        summaries = [summarize(path) for path in file_paths]
+    
+    source_files = [os.path.basename(path) for path in file_paths]
+    quarters = []
+    errors = []
+    for summary in summaries:
+        if "error" in summary:
+            errors.append({"source_file": summary["source_files"][0], "error": summary["error"]})
+            continue
+        quarters.append({
+            "period": summary["period"],
+            "source_file": summary["source_files"][0],
+            "management_tone": summary["management_tone"],
+            "confidence_level": summary["confidence_level"],
+            "key_positives": summary["key_positives"],
+            "key_concerns": summary["key_concerns"],
+            "forward_guidance": summary["forward_guidance"],
+            "capacity_utilization_trends": summary["capacity_utilization_trends"],
+            "growth_initiatives": summary["growth_initiatives"]
+        })
+        if "degraded" in summary:
+            quarters[-1]["degraded"] = summary["degraded"]
+    
+    if not quarters:
+        return {
+            "error": "Could not extract text from any uploaded files",
+            "source_files": source_files,
+            "errors": errors
+        }
+    
+    # Oldest quarter first (stable sort keeps upload order for unknown periods)
+    quarters.sort(key=lambda q: period_sort_key(q["period"]))
+    
+    changes = []
+    for previous, current in zip(quarters, quarters[1:]):
+        prev_tone = TONE_SCALE.index(previous["management_tone"])
+        curr_tone = TONE_SCALE.index(current["management_tone"])
+        if curr_tone > prev_tone:
+            tone_direction = "improved"
+        elif curr_tone < prev_tone:
+            tone_direction = "worsened"
+        else:
+            tone_direction = "unchanged"
+        
+        changes.append({
+            "from_period": previous["period"],
+            "to_period": current["period"],
+            "tone_change": f"{previous['management_tone']} -> {current['management_tone']}",
+            "tone_direction": tone_direction,
+            "guidance_changed": previous["forward_guidance"] != current["forward_guidance"],
+            "previous_guidance": previous["forward_guidance"],
+            "current_guidance": current["forward_guidance"],
+            "capacity_change": f"{previous['capacity_utilization_trends']} -> {current['capacity_utilization_trends']}"
+        })
+    
+    # Report the mode that actually ran (LLM mode falls back to extractive without a key)
+    modes = {summary["summary_mode"] for summary in summaries if "error" not in summary}
     
-    # Build result
     result = {
         "source_files": source_files,
-        "management_tone": tone,
-        "confidence_level": confidence,
-        "key_positives": positives[:5],  # Limit to 5
-        "key_concerns": concerns[:5],  # Limit to 5
-        "forward_guidance": guidance,
-        "capacity_utilization_trends": capacity,
-        "growth_initiatives": initiatives[:3]  # Limit to 3
+        "summary_mode": modes.pop() if len(modes) == 1 else mode,
+        "quarters": quarters,
+        "quarter_over_quarter": changes,
+        "recurring_concerns": find_recurring_concerns(quarters)
     }
+    if errors:
+        result["errors"] = errors
+    if deadline is not None and deadline.degraded:
+        result["degraded"] = dict(deadline.degraded)
     
     return result
@@ -1,14 +1,35 @@
 import os
 import re
+import numpy as np
 import pandas as pd
-from PyPDF2 import PdfReader
 from openai import OpenAI
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Union
+from tools.deadline import Deadline, DeadlineExceeded, llm_client_for
+from tools.pdf_pages import PdfPages
 
 # Don't initialize client globally - do it when needed
 _client = None
 
 
+# 10-15 core income statement line items -> keywords
+LINE_ITEMS = {
+    "Total Revenue": ["total revenue", "revenue from operations", "net revenue", "total income", "sales"],
+    "Other Income": ["other income", "other operating revenue", "other sources"],
+    "Total Income": ["total income", "total revenue and income"],
+    "Operating Expenses": ["total operating expenses", "operating costs", "total expenses"],
+    "Cost of Materials": ["cost of materials consumed", "cost of goods sold", "material cost", "cogs"],
+    "Employee Expenses": ["employee benefit expenses", "employee costs", "staff costs", "salaries"],
+    "Other Expenses": ["other expenses", "administrative expenses"],
+    "EBITDA": ["ebitda", "earnings before interest"],
+    "Depreciation": ["depreciation", "amortization", "depreciation and amortization"],
+    "EBIT": ["ebit", "operating profit", "earnings before interest and tax"],
+    "Finance Costs": ["finance costs", "interest expense", "finance charges"],
+    "PBT": ["profit before tax", "pbt", "earnings before tax"],
+    "Tax Expense": ["tax expense", "income tax", "current tax", "provision for tax"],
+    "PAT": ["profit after tax", "pat", "net profit", "net income"],
+}
+
+
 def get_openai_client():
     """
     Get OpenAI client (lazy initialization)
@@ -26,29 +47,32 @@ def get_openai_client():
     return _client
 
 
-def extract_text_from_pdf(file_path: str) -> str:
+def extract_pdf_pages(file_path: str, deadline: Deadline = None) -> List[str]:
     """
-    Extract text from PDF file
-    Returns plain text or raises error
+    Extract the text of each PDF page (one string per page)
+    Cached by file content, so each page is only parsed once
+    Stops at the page where the deadline runs out and keeps what it has
     """
     try:
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        return text
+        return PdfPages(file_path, deadline).read_all()
     except Exception as e:
         raise Exception(f"Could not extract text from PDF: {str(e)}")
 
 
-def extract_text_from_file(file_path: str) -> str:
+def extract_text_from_pdf(file_path: str, deadline: Deadline = None) -> str:
+    """
+    Extract text from PDF file
+    Returns plain text or raises error
+    """
+    return "".join(page_text + "\n" for page_text in extract_pdf_pages(file_path, deadline) if page_text)
+
+
+def extract_text_from_file(file_path: str, deadline: Deadline = None) -> str:
     """
     Extract text based on file type
     """
     if file_path.endswith('.pdf'):
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(file_path, deadline)
     elif file_path.endswith('.txt'):
         with open(file_path, 'r', encoding='utf-8') as f:
             return f.read()
@@ -87,14 +111,15 @@ def find_numbers_in_text(text: str, keyword: str) -> List[str]:
     return found_numbers
 
 
-def use_llm_fallback(text: str, line_items: Dict[str, List[str]]) -> Dict[str, Any]:
+def use_llm_fallback(text: str, line_items: Dict[str, List[str]], deadline: Deadline = None) -> Dict[str, Any]:
     """
     Use LLM as fallback when pattern matching fails
     Asks LLM to extract specific line items
+    Raises DeadlineExceeded if the call doesn't fit in the deadline
     """
     try:
-        # Get OpenAI client (only when needed)
-        client = get_openai_client()
+        # Get OpenAI client (only when needed), bounded by the time left
+        client = llm_client_for(get_openai_client(), deadline, "llm_fallback")
         
         # Create list of items to extract
         items_to_extract = list(line_items.keys())
@@ -143,15 +168,20 @@ DO NOT make up values. If unclear, use "Not Found".
         
         return result
     
+    except DeadlineExceeded:
+        raise
     except Exception as e:
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceeded("llm_fallback: LLM call timed out") from e
         print(f"LLM fallback failed: {e}")
         return {}
 
 
-def extract_financial_data_from_text(text: str) -> Dict[str, Any]:
+def extract_financial_data_from_text(text: str, deadline: Deadline = None, llm_fallback: bool = True) -> Dict[str, Any]:
     """
     Main extraction logic - extracts 10-15 core income statement items
     Returns data structure with years as columns
+    llm_fallback=False skips the LLM even if pattern matching finds little
     
     HANDLES IMAGE-BASED PDFs RESPONSIBLY
     """
@@ -166,6 +196,8 @@ def extract_financial_data_from_text(text: str) -> Dict[str, Any]:
         
         return {
             "Currency": "Unknown",
+            "Unit": "Unknown",
+            "Unit Scale": 1.0,
             "Years": ["Unknown"],
             "Line Items": {
                 "Total Revenue": {"Unknown": "Not Found"},
@@ -186,24 +218,6 @@ def extract_financial_data_from_text(text: str) -> Dict[str, Any]:
             "Warning": "Image-based PDF detected - OCR not enabled. Text extraction limited."
         }
     
-    # Define 10-15 core line items to extract
-    line_items = {
-        "Total Revenue": ["total revenue", "revenue from operations", "net revenue", "total income", "sales"],
-        "Other Income": ["other income", "other operating revenue", "other sources"],
-        "Total Income": ["total income", "total revenue and income"],
-        "Operating Expenses": ["total operating expenses", "operating costs", "total expenses"],
-        "Cost of Materials": ["cost of materials consumed", "cost of goods sold", "material cost", "cogs"],
-        "Employee Expenses": ["employee benefit expenses", "employee costs", "staff costs", "salaries"],
-        "Other Expenses": ["other expenses", "administrative expenses"],
-        "EBITDA": ["ebitda", "earnings before interest"],
-        "Depreciation": ["depreciation", "amortization", "depreciation and amortization"],
-        "EBIT": ["ebit", "operating profit", "earnings before interest and tax"],
-        "Finance Costs": ["finance costs", "interest expense", "finance charges"],
-        "PBT": ["profit before tax", "pbt", "earnings before tax"],
-        "Tax Expense": ["tax expense", "income tax", "current tax", "provision for tax"],
-        "PAT": ["profit after tax", "pat", "net profit", "net income"],
-    }
-    
     # Try to find currency
     currency = "Unknown"
     currency_patterns = [
@@ -221,6 +235,9 @@ def extract_financial_data_from_text(text: str) -> Dict[str, Any]:
                 currency = match.group(1).upper()
             break
     
+    # Find the unit amounts are stated in (lakhs / crores / millions ...)
+    unit, unit_scale = detect_unit_scale(text)
+    
     # Try to find years - look for FY patterns and year numbers
     year_patterns = [
         r'\bFY[\s-]?(\d{2})\b',  # FY 25, FY-25, FY25
@@ -248,13 +265,15 @@ def extract_financial_data_from_text(text: str) -> Dict[str, Any]:
     # Initialize result structure
     result = {
         "Currency": currency,
+        "Unit": unit,
+        "Unit Scale": unit_scale,
         "Years": unique_years,
         "Line Items": {}
     }
     
     # Extract each line item for each year
     total_found = 0
-    for item_name, keywords in line_items.items():
+    for item_name, keywords in LINE_ITEMS.items():
         result["Line Items"][item_name] = {}
         
         for year in unique_years:
@@ -265,12 +284,15 @@ def extract_financial_data_from_text(text: str) -> Dict[str, Any]:
                 total_found += 1
     
     # If pattern matching found almost nothing, try LLM fallback
-    expected_values = len(line_items) * len(unique_years)
-    if total_found < (expected_values * 0.2):  # Less than 20% found
+    expected_values = len(LINE_ITEMS) * len(unique_years)
+    if llm_fallback and total_found < (expected_values * MIN_FOUND_RATIO) and os.getenv("OPENAI_API_KEY"):
         print("Pattern matching found very little data, trying LLM fallback...")
         try:
-            llm_result = use_llm_fallback(text, line_items)
-            if llm_result and "Items" in llm_result:
+            llm_result = use_llm_fallback(text, LINE_ITEMS, deadline)
+            if not llm_result:
+                # The call failed (network / API error) - worth retrying later
+                result["Incomplete"] = "LLM fallback failed - pattern-matching values only"
+            elif "Items" in llm_result:
                 # Merge LLM results with pattern matching results
                 for item_name, year_values in llm_result["Items"].items():
                     if item_name in result["Line Items"]:
@@ -286,12 +308,112 @@ def extract_financial_data_from_text(text: str) -> Dict[str, Any]:
                 # Update years if LLM found different ones
                 if "Years" in llm_result and llm_result["Years"]:
                     result["Years"] = llm_result["Years"]
+        except DeadlineExceeded as e:
+            # Out of time - keep the pattern-matching values
+            result["Degraded"] = f"LLM fallback skipped ({e}) - pattern-matching values only"
+            deadline.mark_degraded("llm_fallback", str(e))
         except Exception as e:
             print(f"LLM fallback error: {e}")
+            result["Incomplete"] = "LLM fallback failed - pattern-matching values only"
     
     return result
 
 
+# Pattern matching is "enough" at this share of line item x year values
+# (below it: widen to the whole document, then the LLM fallback)
+MIN_FOUND_RATIO = 0.2
+
+# Statement-page locator: pages kept, and minimum distinct line items on a page
+MAX_STATEMENT_PAGES = 4
+MIN_PAGE_ITEMS = 3
+
+# (keywords, word-boundary pattern) - the plain substring check runs first,
+# it's much cheaper than the regex on pages that don't mention the item
+ITEM_PATTERNS = [
+    (keywords, re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b")) for keywords in LINE_ITEMS.values()
+]
+NUMBER_TOKEN = re.compile(r"^\(?-?[\d,]*\d(?:\.\d+)?\)?%?$")
+YEAR_TOKEN = re.compile(r"\bFY[\s-]?'?\d{2}\b|\b(?:19|20)\d{2}\b", re.IGNORECASE)
+
+
+def score_page(page_text: str) -> float:
+    """
+    How much a page looks like a financial statement:
+    share of line items mentioned + share of numeric tokens + a year column header
+    Returns 0 for pages with fewer than MIN_PAGE_ITEMS line items
+    """
+    lower = page_text.lower()
+    items = sum(
+        1 for keywords, pattern in ITEM_PATTERNS
+        if any(keyword in lower for keyword in keywords) and pattern.search(lower)
+    )
+    if items < MIN_PAGE_ITEMS:
+        return 0.0
+    
+    tokens = lower.split()
+    numeric_density = sum(1 for token in tokens if NUMBER_TOKEN.match(token)) / len(tokens)
+    
+    # Year header: a short line with two or more different years (FY 25  FY 24 / 2024  2023)
+    year_header = any(
+        len(line.split()) <= 12 and len(set(YEAR_TOKEN.findall(line))) >= 2
+        for line in page_text.splitlines()
+    )
+    
+    return items / len(LINE_ITEMS) + numeric_density + (0.5 if year_header else 0.0)
+
+
+def locate_statement_pages(pages: List[str]) -> List[int]:
+    """
+    Indices of the pages most likely to hold the income statement, in page order
+    (at most MAX_STATEMENT_PAGES, each scoring at least half the best page)
+    """
+    scores = [score_page(page_text) for page_text in pages]
+    best = max(scores, default=0.0)
+    if best == 0:
+        return []
+    
+    ranked = sorted(range(len(pages)), key=lambda index: scores[index], reverse=True)
+    candidates = [index for index in ranked[:MAX_STATEMENT_PAGES] if scores[index] >= best / 2]
+    return sorted(candidates)
+
+
+def found_ratio(data: Dict[str, Any]) -> float:
+    values = [value for year_values in data["Line Items"].values() for value in year_values.values()]
+    return sum(1 for value in values if value != "Not Found") / max(len(values), 1)
+
+
+def read_pages(pages: Union[List[str], PdfPages], indices) -> List[str]:
+    if isinstance(pages, PdfPages):
+        return pages.read(indices)
+    return [pages[index] for index in indices]
+
+
+def extract_financial_data_from_pages(pages: Union[List[str], PdfPages], deadline: Deadline = None) -> Dict[str, Any]:
+    """
+    Extract from the likely statement pages only, so narrative sections
+    don't add false matches or stray years
+    For a PdfPages, the pages are located on the cheap content-stream text and
+    only the chosen ones are extracted (all of them if none can be told apart)
+    Widens to the whole document (and the LLM fallback) if those pages don't
+    yield at least MIN_FOUND_RATIO of the values
+    """
+    if isinstance(pages, PdfPages):
+        candidates = locate_statement_pages(pages.signal_texts())
+        if not candidates:
+            candidates = locate_statement_pages(pages.read_all())
+    else:
+        candidates = locate_statement_pages(pages)
+    
+    if candidates and len(candidates) < len(pages):
+        statement_text = "\n".join(read_pages(pages, candidates))
+        data = extract_financial_data_from_text(statement_text, deadline, llm_fallback=False)
+        if "Warning" not in data and found_ratio(data) >= MIN_FOUND_RATIO:
+            data["Statement Pages"] = [index + 1 for index in candidates]
+            return data
+    
+    return extract_financial_data_from_text("\n".join(read_pages(pages, range(len(pages)))), deadline)
+
+
 def find_value_for_item_and_year(text: str, keywords: List[str], year: str) -> str:
     """
     Find the numeric value for a specific line item and year
@@ -329,28 +451,180 @@ def find_value_for_item_and_year(text: str, keywords: List[str], year: str) -> s
     return ""
 
 
-def extract_financial_data(file_paths: List[str]) -> str:
+# Multipliers from stated units to absolute currency units
+UNIT_SCALES = {
+    "thousand": 1e3,
+    "lakh": 1e5,
+    "lac": 1e5,
+    "million": 1e6,
+    "mn": 1e6,
+    "crore": 1e7,
+    "cr": 1e7,
+    "billion": 1e9,
+    "bn": 1e9,
+}
+
+UNIT_PATTERN = re.compile(
+    r'\b(?:amounts?|figures?|all|values?|rs\.?|inr|usd|eur|gbp|₹|\$)?\s*in\s+'
+    r'(?:(?:rs\.?|inr|usd|eur|gbp|jpy|cny|₹|\$)\s*)?(thousands?|lakhs?|lacs?|millions?|mn|crores?|cr|billions?|bn)\b',
+    re.IGNORECASE
+)
+
+# Derived metric rows, in output order
+DERIVED_METRICS = ["EBITDA Margin %", "PAT Margin %", "Revenue YoY Growth %", "PAT YoY Growth %",
+                   "Income Check Difference", "Income Check OK"]
+
+
+def detect_unit_scale(text: str) -> tuple:
+    """
+    Find the unit amounts are stated in, e.g. "(All amounts in USD millions)"
+    Returns (unit name, multiplier to absolute units); ("units", 1.0) if not stated
+    """
+    match = UNIT_PATTERN.search(text)
+    if not match:
+        return "units", 1.0
+    
+    unit = match.group(1).lower()
+    for name, scale in UNIT_SCALES.items():
+        if unit.rstrip("s") == name:
+            return name, scale
+    return "units", 1.0
+
+
+def year_number(year: str) -> int:
+    """
+    Calendar/fiscal year number for a year label: "FY 25" and "2025" both map
+    to 2025; returns -1 for labels without a year ("Unknown")
+    """
+    digits = re.sub(r'\D', '', str(year))
+    if not digits:
+        return -1
+    value = int(digits)
+    return 2000 + value if value < 100 else value
+
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """
+    Vectorized string -> float: "1,23,456" -> 123456.0, "(678.2)" -> -678.2,
+    "Not Found" / blanks -> NaN
+    """
+    text = values.astype(str).str.strip()
+    negative = text.str.match(r'^\(.*\)$') | text.str.startswith('-')
+    cleaned = text.str.replace(r'[^\d.]', '', regex=True)
+    numbers = pd.to_numeric(cleaned.where(cleaned != ''), errors='coerce')
+    return numbers.where(~negative, -numbers)
+
+
+def build_line_item_matrix(all_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Typed matrix of every file's line items
+    Index: (Source File, Line Item), columns: year numbers (newest first)
+    Values: float64 in absolute currency units (unit scale applied), NaN if missing
+    """
+    records = [
+        (file_data["Source File"], item_name, year_number(year), value, file_data.get("Unit Scale", 1.0))
+        for file_data in all_data
+        for item_name, year_values in file_data["Line Items"].items()
+        for year, value in year_values.items()
+    ]
+    long_form = pd.DataFrame(records, columns=["Source File", "Line Item", "Year", "Raw", "Scale"])
+    long_form["Value"] = parse_amounts(long_form["Raw"]) * long_form["Scale"]
+    
+    # Values without a year can't be placed in a column
+    dated = long_form[long_form["Year"] > 0]
+    matrix = dated.pivot_table(
+        index=["Source File", "Line Item"], columns="Year", values="Value", aggfunc="first", dropna=False
+    )
+    
+    # pivot_table drops all-NaN rows/columns - put every file, item and year back
+    files = list(dict.fromkeys(long_form["Source File"]))
+    items = list(dict.fromkeys(long_form["Line Item"]))
+    years = sorted(dated["Year"].unique(), reverse=True)
+    full_index = pd.MultiIndex.from_product([files, items], names=["Source File", "Line Item"])
+    return matrix.reindex(index=full_index, columns=years).astype("float64")
+
+
+def compute_derived_metrics(matrix: pd.DataFrame) -> pd.DataFrame:
+    """
+    Derived metrics for every file and year at once
+    Index: (Source File, Metric), columns: years (same order as the matrix)
+    """
+    def item(name: str) -> pd.DataFrame:
+        return matrix.xs(name, level="Line Item")
+    
+    revenue = item("Total Revenue")
+    pat = item("PAT")
+    
+    # Growth against exactly the previous year (NaN if that year is missing)
+    def yoy_growth(values: pd.DataFrame) -> pd.DataFrame:
+        if values.columns.empty:
+            return values
+        all_years = range(max(values.columns), min(values.columns) - 1, -1)
+        contiguous = values.reindex(columns=all_years)
+        growth = (contiguous / contiguous.shift(-1, axis=1) - 1) * 100
+        return growth.reindex(columns=values.columns)
+    
+    income_difference = revenue + item("Other Income") - item("Total Income")
+    income_ok = income_difference.abs() <= item("Total Income").abs() * 0.01
+    
+    metrics = {
+        "EBITDA Margin %": item("EBITDA") / revenue * 100,
+        "PAT Margin %": pat / revenue * 100,
+        "Revenue YoY Growth %": yoy_growth(revenue),
+        "PAT YoY Growth %": yoy_growth(pat),
+        "Income Check Difference": income_difference,
+        # 1.0 = Revenue + Other Income matches Total Income (within 1%), 0.0 = mismatch
+        "Income Check OK": income_ok.astype("float64").where(income_difference.notna()),
+    }
+    
+    derived = pd.concat(metrics, names=["Metric", "Source File"]).swaplevel().sort_index(
+        level="Source File", sort_remaining=False
+    )
+    derived = derived.reindex(
+        pd.MultiIndex.from_product([revenue.index, DERIVED_METRICS], names=["Source File", "Metric"])
+    )
+    return derived.replace([np.inf, -np.inf], np.nan)
+
+
+def extract_financial_data(file_paths: List[str], output_file: str = "financial_extraction.xlsx",
+                           deadline: Deadline = None) -> Tuple[str, bool]:
     """
     Main function to extract financial data from uploaded files
-    Returns path to generated Excel file
+    Writes the Excel file to output_file
+    Returns (output_file, complete) - complete is False for the error file and
+    when an LLM fallback failed or the deadline cut anything short, so the
+    file shouldn't be cached
+    deadline: time budget for the whole request - files and LLM calls past it
+    are skipped and listed in deadline.degraded
     """
     all_data = []
     
-    for file_path in file_paths:
+    for index, file_path in enumerate(file_paths):
+        if deadline is not None and deadline.expired:
+            skipped = ", ".join(os.path.basename(path) for path in file_paths[index:])
+            deadline.mark_degraded("source_files", f"Deadline exceeded before reading: {skipped}")
+            break
+        
         try:
             print(f"\nProcessing: {os.path.basename(file_path)}")
             
-            # Extract text
-            text = extract_text_from_file(file_path)
-            
-            print(f"  Extracted {len(text)} characters of text")
+            # PDF pages are extracted lazily - statement pages first
+            if file_path.endswith('.pdf'):
+                pages = PdfPages(file_path, deadline)
+                print(f"  {len(pages)} page(s)")
+                has_text = (any(text.strip() for text in pages.signal_texts())
+                            or any(text.strip() for text in pages.read_all()))
+            else:
+                pages = [extract_text_from_file(file_path, deadline)]
+                print(f"  Extracted {len(pages[0])} characters of text")
+                has_text = bool(pages[0].strip())
             
-            if not text.strip():
+            if not has_text:
                 print("  ⚠️ No text extracted - empty file")
                 continue
             
-            # Extract financial data
-            data = extract_financial_data_from_text(text)
+            # Extract financial data (statement pages first)
+            data = extract_financial_data_from_pages(pages, deadline)
             data["Source File"] = os.path.basename(file_path)
             all_data.append(data)
             
@@ -369,9 +643,8 @@ def extract_financial_data(file_paths: List[str]) -> str:
             "Possible Reasons": "1) Image-based PDFs (OCR not enabled), 2) Unsupported format, 3) Corrupted files",
             "Solution": "Use text-based PDFs or enable OCR preprocessing"
         }])
-        output_file = "financial_extraction.xlsx"
         df.to_excel(output_file, index=False, engine='openpyxl')
-        return output_file
+        return output_file, False
     
     # Convert to DataFrame with years as columns
     rows = []
@@ -379,7 +652,11 @@ def extract_financial_data(file_paths: List[str]) -> str:
         source_file = file_data["Source File"]
         currency = file_data["Currency"]
         years = file_data["Years"]
-        warning = file_data.get("Warning", "")
+        warning = "; ".join(filter(None, [file_data.get("Warning"), file_data.get("Degraded"), file_data.get("Incomplete")]))
+        notes = warning
+        if file_data.get("Statement Pages"):
+            pages_note = f"Statement pages: {', '.join(map(str, file_data['Statement Pages']))}"
+            notes = "; ".join(filter(None, [warning, pages_note]))
         
         # Add header row for this file
         header_text = f"=== {source_file} ==="
@@ -390,7 +667,7 @@ def extract_financial_data(file_paths: List[str]) -> str:
             "Line Item": header_text,
             **{year: "" for year in years},
             "Currency": currency,
-            "Notes": warning
+            "Notes": notes
         })
         
         # Add each line item as a row
@@ -417,6 +694,11 @@ def extract_financial_data(file_paths: List[str]) -> str:
         # Add blank row between files
         rows.append({})
     
+    # List whatever was cut short by the deadline
+    if deadline is not None and deadline.degraded:
+        for field, reason in deadline.degraded.items():
+            rows.append({"Line Item": f"⚠️ Incomplete ({field})", "Notes": reason})
+    
     # Create DataFrame
     df = pd.DataFrame(rows)
     
@@ -436,10 +718,19 @@ def extract_financial_data(file_paths: List[str]) -> str:
     # Reorder columns
     df = df.reindex(columns=column_order)
     
+    # Typed numeric matrix + derived metrics across the whole batch
+    matrix = build_line_item_matrix(all_data)
+    derived = compute_derived_metrics(matrix)
+    
     # Save to Excel
-    output_file = "financial_extraction.xlsx"
-    df.to_excel(output_file, index=False, engine='openpyxl')
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name="Extraction", index=False)
+        matrix.reset_index().to_excel(writer, sheet_name="Normalized Values", index=False)
+        derived.reset_index().to_excel(writer, sheet_name="Derived Metrics", index=False)
     
     print(f"\n✅ Excel file generated: {output_file}")
     
-    return output_file
\ No newline at end of file
+    complete = not any("Incomplete" in file_data or "Degraded" in file_data for file_data in all_data)
+    if deadline is not None and deadline.degraded:
+        complete = False
+    return output_file, complete
\ No newline at end of file
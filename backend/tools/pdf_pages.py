@@ -0,0 +1,166 @@
+import os
+import re
+from typing import Dict, Iterable, List
+
+from PyPDF2 import PdfReader
+
+from tools.deadline import Deadline
+from tools.result_cache import file_digest, load_result, save_result
+
+# PyPDF2's extract_text() lays out every glyph run and is the slow part of
+# reading a long report. Pages are extracted one at a time, on demand, and
+# cached by file content (page number -> text). For picking the pages worth
+# extracting, signal_texts() pulls the string operands straight out of each
+# page's content stream instead - several times cheaper, and close enough to
+# score pages by line items, numbers and year headers. Pages drawn with
+# custom-encoded fonts come out as gibberish there and just score 0.
+
+NUM = rb"[-+]?(?:\d+\.?\d*|\.\d+)"
+LITERAL = rb"\((?:\\.|[^\\()]|\((?:\\.|[^\\()])*\))*\)"  # one level of nested parens
+HEX = rb"<[0-9A-Fa-f\s]*>"
+
+# Only the text-showing and text-positioning operators (with their operands);
+# finditer skips everything else without leaving C
+TEXT_OPERATOR = re.compile(
+    rb"(?P<bt>\bBT\b)"
+    rb"|(?P<tm>(?:" + NUM + rb"\s+){5}(?P<tm_y>" + NUM + rb"))\s*Tm\b"
+    rb"|(?P<td>" + NUM + rb")\s+(?P<td_y>" + NUM + rb")\s*(?P<td_op>T[dD])\b"
+    rb"|(?P<tl>" + NUM + rb")\s*TL\b"
+    rb"|(?P<next>T\*)"
+    rb"|(?P<string>" + LITERAL + rb"|" + HEX + rb")\s*(?P<show_op>Tj|'|\")"
+    rb"|\[(?P<array>(?:" + LITERAL + rb"|" + HEX + rb"|" + NUM + rb"|\s)*)\]\s*TJ",
+    re.DOTALL,
+)
+ARRAY_PART = re.compile(LITERAL + rb"|" + HEX + rb"|" + NUM, re.DOTALL)
+STRING_ESCAPE = re.compile(rb"\\([0-7]{1,3}|\r\n|.)", re.DOTALL)
+ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f", b"\r\n": b"", b"\n": b"", b"\r": b""}
+
+# TJ adjustments (thousandths of an em) this far to the right read as a space
+TJ_SPACE = -200
+
+
+def decode_string(token: bytes) -> str:
+    if token.startswith(b"<"):
+        hex_digits = re.sub(rb"\s", b"", token[1:-1])
+        if len(hex_digits) % 2:
+            hex_digits += b"0"
+        return bytes.fromhex(hex_digits.decode("ascii")).decode("latin-1")
+
+    def unescape(match):
+        escaped = match.group(1)
+        if escaped[:1].isdigit():
+            return bytes([int(escaped, 8) & 0xFF])
+        return ESCAPES.get(escaped, escaped)
+
+    return STRING_ESCAPE.sub(unescape, token[1:-1]).decode("latin-1")
+
+
+def content_stream_text(data: bytes) -> str:
+    """
+    Approximate text of a page content stream: shown strings joined into
+    lines by their baseline (Tm / Td / TD / T* / ' / "), no font decoding
+    """
+    lines: Dict[float, List[str]] = {}
+    y = leading = 0.0
+    scale = 1.0
+
+    for match in TEXT_OPERATOR.finditer(data):
+        if match.group("bt"):
+            y, scale = 0.0, 1.0
+        elif match.group("tm"):
+            scale = float(match.group("tm").split()[3]) or 1.0
+            y = float(match.group("tm_y"))
+        elif match.group("td"):
+            y += float(match.group("td_y")) * scale
+            if match.group("td_op") == b"TD":
+                leading = -float(match.group("td_y"))
+        elif match.group("tl"):
+            leading = float(match.group("tl"))
+        elif match.group("next"):
+            y -= leading * scale
+        elif match.group("string"):
+            if match.group("show_op") != b"Tj":
+                y -= leading * scale
+            lines.setdefault(round(y, 1), []).append(decode_string(match.group("string")))
+        else:
+            parts = []
+            for part in ARRAY_PART.findall(match.group("array")):
+                if part[:1] in (b"(", b"<"):
+                    parts.append(decode_string(part))
+                elif float(part) < TJ_SPACE:
+                    parts.append(" ")
+            lines.setdefault(round(y, 1), []).append("".join(parts))
+
+    # Top of the page first
+    return "\n".join(" ".join(lines[line]) for line in sorted(lines, reverse=True))
+
+
+class PdfPages:
+    """
+    The pages of a PDF, extracted lazily: read() runs extract_text() only on
+    the pages asked for, and only once per document (cached by file content)
+    """
+
+    def __init__(self, file_path: str, deadline: Deadline = None):
+        self.file_path = file_path
+        self.deadline = deadline
+        self.cache_key = file_digest(file_path)
+        self.reader = PdfReader(file_path)
+        self._texts = self._load()
+
+    def __len__(self) -> int:
+        return len(self.reader.pages)
+
+    def _load(self) -> Dict[int, str]:
+        cached = load_result("pdf_pages", self.cache_key) or {}
+        if isinstance(cached, list):
+            # Older entries: every page, as a list
+            return dict(enumerate(cached))
+        return {int(index): text for index, text in cached.items()}
+
+    def read(self, indices: Iterable[int]) -> List[str]:
+        """
+        Text of the given pages, extracting the ones not seen before
+        Stops at the page where the deadline runs out and returns what it has
+        """
+        indices = list(indices)
+        texts = []
+        extracted = False
+        for index in indices:
+            if index not in self._texts:
+                if self.deadline is not None and self.deadline.expired:
+                    self.deadline.mark_degraded(
+                        "source_text",
+                        f"{os.path.basename(self.file_path)}: read {len(texts)} of {len(indices)} pages before the deadline"
+                    )
+                    break
+                self._texts[index] = self.reader.pages[index].extract_text() or ""
+                extracted = True
+            texts.append(self._texts[index])
+
+        if extracted:
+            # Merge with pages another request may have cached meanwhile
+            merged = {**self._load(), **self._texts}
+            save_result("pdf_pages", self.cache_key, {str(index): text for index, text in merged.items()})
+        return texts
+
+    def read_all(self) -> List[str]:
+        return self.read(range(len(self)))
+
+    def signal_texts(self) -> List[str]:
+        """
+        Cheap approximate text of every page (see content_stream_text), cached
+        """
+        cached = load_result("pdf_signals", self.cache_key)
+        if cached is not None:
+            return cached
+
+        texts = []
+        for page in self.reader.pages:
+            try:
+                contents = page.get_contents()
+                texts.append(content_stream_text(contents.get_data()) if contents is not None else "")
+            except Exception:
+                texts.append("")
+        save_result("pdf_signals", self.cache_key, texts)
+        return texts
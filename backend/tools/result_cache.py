@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Results are keyed by a hash of the document content, so re-uploading the
+# same file (under any name) reuses earlier work.
+# Kept in memory and persisted as JSON under CACHE_DIR so they survive restarts.
+CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "cache")
+
+# Entries kept in memory (least recently used dropped first); the rest are
+# read back from disk
+MAX_MEMORY_ENTRIES = int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "256"))
+
+_memory: "OrderedDict[str, Any]" = OrderedDict()
+_lock = threading.Lock()
+
+# (path, mtime, size) -> digest, so unchanged files are only hashed once
+_digests: Dict[tuple, str] = {}
+
+
+def file_digest(file_path: str) -> str:
+    """
+    SHA-256 of a file's content (hex)
+    """
+    stat = os.stat(file_path)
+    stat_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    if stat_key in _digests:
+        return _digests[stat_key]
+
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+
+    digest = sha.hexdigest()
+    with _lock:
+        _digests[stat_key] = digest
+    return digest
+
+
+def _cache_path(namespace: str, key: str) -> str:
+    return os.path.join(CACHE_DIR, namespace, f"{key}.json")
+
+
+def _remember(memory_key: str, value: Any) -> None:
+    with _lock:
+        _memory[memory_key] = value
+        _memory.move_to_end(memory_key)
+        while len(_memory) > MAX_MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def load_result(namespace: str, key: str) -> Optional[Any]:
+    """
+    Return a cached result, or None if there isn't one
+    """
+    memory_key = f"{namespace}/{key}"
+    with _lock:
+        if memory_key in _memory:
+            _memory.move_to_end(memory_key)
+            return _memory[memory_key]
+
+    path = _cache_path(namespace, key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            value = json.load(f)
+    except Exception as e:
+        print(f"Error reading cache entry {path}: {e}")
+        return None
+
+    _remember(memory_key, value)
+    return value
+
+
+def save_result(namespace: str, key: str, value: Any) -> None:
+    """
+    Store a JSON-serialisable result in memory and on disk
+    """
+    _remember(f"{namespace}/{key}", value)
+
+    path = _cache_path(namespace, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Error writing cache entry {path}: {e}")
@@ -0,0 +1,288 @@
+import os
+import re
+import json
+import threading
+import zlib
+import numpy as np
+import scipy.sparse as sp
+from openai import OpenAI
+from typing import List, Dict, Any, Tuple
+
+from tools.deadline import Deadline, DeadlineExceeded, llm_client_for
+from tools.financial_extractor import extract_text_from_file
+from tools.result_cache import CACHE_DIR, file_digest
+
+# Passage index for ad-hoc questions over the uploaded documents.
+# Each document is split into overlapping word windows; term counts are stored
+# as a sparse passages x features matrix, with terms hashed into a fixed number
+# of columns so per-document matrices can be stacked without a shared vocabulary.
+# Per-document matrices are persisted under cache/retrieval/ keyed by content hash.
+
+N_FEATURES = 2 ** 18
+PASSAGE_WORDS = 120
+PASSAGE_STRIDE = 90
+INDEX_VERSION = "1"
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "at", "by", "with", "from",
+    "is", "are", "was", "were", "be", "been", "it", "its", "this", "that", "these", "those",
+    "as", "we", "our", "they", "their", "what", "which", "who", "how", "did", "do", "does",
+    "say", "said", "about", "any", "there", "has", "have", "had"
+}
+
+# Don't initialize client globally - do it when needed
+_client = None
+
+# Combined index for the current set of documents
+_index_lock = threading.Lock()
+_current_index = None
+
+
+def get_openai_client():
+    """
+    Get OpenAI client (lazy initialization)
+    Only creates client when actually needed
+    """
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise Exception(
+                "OpenAI API key not found. Please set OPENAI_API_KEY in your .env file. "
+                "LLM is required to answer questions (retrieval works without it)."
+            )
+        _client = OpenAI(api_key=api_key)
+    return _client
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens without stopwords
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def hash_token(token: str) -> int:
+    """
+    Stable column for a token (Python's hash() is salted per process)
+    """
+    return zlib.crc32(token.encode("utf-8")) % N_FEATURES
+
+
+def split_passages(text: str) -> List[Dict[str, Any]]:
+    """
+    Split text into overlapping windows of PASSAGE_WORDS words
+    Returns [{"text": ..., "start": ..., "end": ...}, ...] with character offsets
+    """
+    words = [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+    passages = []
+    for first in range(0, len(words), PASSAGE_STRIDE):
+        last = min(first + PASSAGE_WORDS, len(words)) - 1
+        start, end = words[first][0], words[last][1]
+        passages.append({"text": text[start:end], "start": start, "end": end})
+        if last == len(words) - 1:
+            break
+    return passages
+
+
+def count_matrix(passages: List[Dict[str, Any]]) -> sp.csr_matrix:
+    """
+    Sparse term-count matrix (passages x N_FEATURES)
+    """
+    columns = {}
+    rows, cols = [], []
+    for row, passage in enumerate(passages):
+        for token in tokenize(passage["text"]):
+            col = columns.get(token)
+            if col is None:
+                col = columns[token] = hash_token(token)
+            rows.append(row)
+            cols.append(col)
+
+    data = np.ones(len(rows), dtype=np.float32)
+    matrix = sp.csr_matrix((data, (rows, cols)), shape=(len(passages), N_FEATURES), dtype=np.float32)
+    matrix.sum_duplicates()
+    return matrix
+
+
+def build_document_index(file_path: str) -> Tuple[List[Dict[str, Any]], sp.csr_matrix]:
+    """
+    Passages + term counts for one document, loaded from disk if already built
+    """
+    digest = file_digest(file_path)
+    base_path = os.path.join(CACHE_DIR, "retrieval", f"v{INDEX_VERSION}-{digest}")
+
+    if os.path.exists(base_path + ".npz") and os.path.exists(base_path + ".json"):
+        with open(base_path + ".json", "r", encoding="utf-8") as f:
+            passages = json.load(f)
+        return passages, sp.load_npz(base_path + ".npz").tocsr()
+
+    text = extract_text_from_file(file_path)
+    passages = split_passages(text)
+    matrix = count_matrix(passages)
+
+    # Written to temp files and renamed, .json first - the .npz appearing marks
+    # the pair complete, so a concurrent build never reads half a file
+    try:
+        os.makedirs(os.path.dirname(base_path), exist_ok=True)
+        tmp_suffix = f".{threading.get_ident()}.tmp"
+        with open(base_path + ".json" + tmp_suffix, "w", encoding="utf-8") as f:
+            json.dump(passages, f)
+        os.replace(base_path + ".json" + tmp_suffix, base_path + ".json")
+        with open(base_path + ".npz" + tmp_suffix, "wb") as f:
+            sp.save_npz(f, matrix)
+        os.replace(base_path + ".npz" + tmp_suffix, base_path + ".npz")
+    except Exception as e:
+        print(f"Error saving passage index for {file_path}: {e}")
+
+    return passages, matrix
+
+
+class PassageIndex:
+    """
+    BM25 index over the passages of several documents
+    Weights are precomputed at build time, so a query is a column slice + row sum
+    """
+
+    def __init__(self, documents: List[Tuple[str, List[Dict[str, Any]], sp.csr_matrix]]):
+        self.passages = []
+        matrices = []
+        for file_name, passages, matrix in documents:
+            self.passages.extend({**passage, "source_file": file_name} for passage in passages)
+            matrices.append(matrix)
+
+        if not self.passages:
+            self.weights = sp.csc_matrix((0, N_FEATURES), dtype=np.float32)
+            return
+
+        counts = sp.vstack(matrices).tocsr()
+        n_passages = counts.shape[0]
+
+        # Inverse document frequency per column
+        doc_freq = np.bincount(counts.indices, minlength=N_FEATURES)
+        idf = np.log1p((n_passages - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        # BM25 term weight for every stored count
+        passage_len = np.asarray(counts.sum(axis=1)).ravel()
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * passage_len / max(passage_len.mean(), 1))
+        row_of_value = np.repeat(np.arange(n_passages), np.diff(counts.indptr))
+        tf = counts.data
+        weighted = idf[counts.indices] * tf * (BM25_K1 + 1) / (tf + length_norm[row_of_value])
+
+        self.weights = sp.csr_matrix((weighted, counts.indices, counts.indptr), shape=counts.shape).tocsc()
+
+    def search(self, question: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Top-k passages for a question, best first
+        """
+        columns = sorted({hash_token(token) for token in tokenize(question)})
+        if not columns or not self.passages:
+            return []
+
+        scores = np.asarray(self.weights[:, columns].sum(axis=1)).ravel()
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+
+        return [
+            {**self.passages[i], "score": round(float(scores[i]), 4)}
+            for i in best
+            if scores[i] > 0
+        ]
+
+
+def build_index(file_paths: List[str]) -> PassageIndex:
+    """
+    Build (or reuse) the combined index for a set of uploaded files
+    Called right after upload; questions reuse the same index
+    """
+    global _current_index
+    key = tuple(file_digest(path) for path in file_paths)
+
+    with _index_lock:
+        if _current_index is not None and _current_index[0] == key:
+            return _current_index[1]
+
+        documents = []
+        failed = False
+        for file_path in file_paths:
+            try:
+                passages, matrix = build_document_index(file_path)
+                documents.append((os.path.basename(file_path), passages, matrix))
+            except Exception as e:
+                print(f"Error indexing {file_path}: {e}")
+                failed = True
+
+        index = PassageIndex(documents)
+        # An index missing a document is used for this question only - the
+        # next one retries the document
+        if not failed:
+            _current_index = (key, index)
+        return index
+
+
+def answer_question(file_paths: List[str], question: str, top_k: int = 5,
+                    deadline: Deadline = None) -> Dict[str, Any]:
+    """
+    Answer a question from the top-k passages of the uploaded documents
+    Only the retrieved passages are sent to the LLM
+    If the LLM call doesn't fit in the deadline, the passages are returned on their own
+    """
+    index = build_index(file_paths)
+    hits = index.search(question, top_k)
+
+    sources = [
+        {"source_file": hit["source_file"], "passage": hit["text"], "start": hit["start"], "score": hit["score"]}
+        for hit in hits
+    ]
+
+    if not hits:
+        return {"question": question, "answer": "Not mentioned", "sources": []}
+
+    try:
+        # Get OpenAI client (only when needed), bounded by the time left
+        client = llm_client_for(get_openai_client(), deadline, "answer")
+
+        context = "\n\n".join(
+            f"[{i + 1}] ({hit['source_file']}) {hit['text']}" for i, hit in enumerate(hits)
+        )
+        prompt = f"""You are answering a research question using excerpts from uploaded documents.
+
+Excerpts:
+{context}
+
+Question: {question}
+
+Answer in 1-4 sentences using ONLY the excerpts above, citing them like [1], [2].
+If the excerpts do not answer the question, reply exactly: Not mentioned
+
+Do NOT make up information.
+"""
+
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=300
+        )
+
+        answer = response.choices[0].message.content.strip()
+        return {"question": question, "answer": answer or "Not mentioned", "sources": sources}
+
+    except Exception as e:
+        if isinstance(e, DeadlineExceeded) or (deadline is not None and deadline.expired):
+            reason = str(e) if isinstance(e, DeadlineExceeded) else "answer: LLM call timed out"
+            deadline.mark_degraded("answer", reason)
+            return {
+                "question": question,
+                "answer": "Not available - see the sources below",
+                "sources": sources,
+                "degraded": {"answer": reason}
+            }
+        print(f"Error answering question: {e}")
+        return {"question": question, "answer": "Error generating answer", "sources": sources}
@@ -5,8 +5,10 @@ import { uploadFiles } from '../services/api';
 import { useAppContext } from '../context/AppContext';
 import './Upload.css';
 
-const ACCEPTED_TYPES = ['.pdf', '.txt'];
+const ACCEPTED_TYPES = ['.pdf', '.txt', '.zip', '.tar.gz', '.tgz'];
+const ARCHIVE_TYPES = ['.zip', '.tar.gz', '.tgz'];
 const MAX_FILE_SIZE_MB = 20;
+const MAX_ARCHIVE_SIZE_MB = 200;
 
 function formatBytes(bytes) {
   if (bytes < 1024) return `${bytes} B`;
@@ -29,13 +31,14 @@ export default function Upload() {
     const valid = [];
 
     Array.from(files).forEach((file) => {
-      const ext = '.' + file.name.split('.').pop().toLowerCase();
-      if (!ACCEPTED_TYPES.includes(ext)) {
-        newErrors.push(`${file.name}: Unsupported format (only PDF/TXT allowed)`);
+      const name = file.name.toLowerCase();
+      if (!ACCEPTED_TYPES.some((type) => name.endsWith(type))) {
+        newErrors.push(`${file.name}: Unsupported format (only PDF/TXT or ZIP/TAR.GZ archives allowed)`);
         return;
       }
-      if (file.size > MAX_FILE_SIZE_MB * 1024 * 1024) {
-        newErrors.push(`${file.name}: File too large (max ${MAX_FILE_SIZE_MB} MB)`);
+      const maxSizeMb = ARCHIVE_TYPES.some((type) => name.endsWith(type)) ? MAX_ARCHIVE_SIZE_MB : MAX_FILE_SIZE_MB;
+      if (file.size > maxSizeMb * 1024 * 1024) {
+        newErrors.push(`${file.name}: File too large (max ${maxSizeMb} MB)`);
         return;
       }
       valid.push(file);
@@ -113,7 +116,7 @@ export default function Upload() {
         <div className="upload-page__header">
           <h1 className="upload-page__title">Upload Documents</h1>
           <p className="upload-page__subtitle">
-            Upload your PDF or TXT financial documents. Files are processed server-side and
+            Upload your PDF or TXT financial documents, or a ZIP / TAR.GZ archive of them. Files are processed server-side and
             used for the analysis tools.
           </p>
         </div>
@@ -130,7 +133,7 @@ export default function Upload() {
             ref={fileInputRef}
             type="file"
             multiple
-            accept=".pdf,.txt"
+            accept=".pdf,.txt,.zip,.tar.gz,.tgz"
             onChange={onFileInputChange}
             className="dropzone__input"
             aria-label="File upload input"
@@ -147,7 +150,7 @@ export default function Upload() {
               <p className="dropzone__text">
                 <strong>Click to browse</strong> or drag & drop files here
               </p>
-              <p className="dropzone__hint">Supports PDF, TXT — up to {MAX_FILE_SIZE_MB}MB per file</p>
+              <p className="dropzone__hint">Supports PDF, TXT — up to {MAX_FILE_SIZE_MB}MB per file; ZIP / TAR.GZ archives up to {MAX_ARCHIVE_SIZE_MB}MB</p>
             </div>
           )}
         </div>
@@ -178,7 +181,9 @@ export default function Upload() {
             {localFiles.map((file) => (
               <div key={file.name} className="file-item">
                 <div className="file-item__icon">
-                  {file.name.endsWith('.pdf') ? '📄' : '📝'}
+                  {ARCHIVE_TYPES.some((type) => file.name.toLowerCase().endsWith(type))
+                    ? '🗜️'
+                    : file.name.endsWith('.pdf') ? '📄' : '📝'}
                 </div>
                 <div className="file-item__info">
                   <div className="file-item__name">{file.name}</div>
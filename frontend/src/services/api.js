@@ -3,6 +3,42 @@
 
 const BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
 
+// Last result + ETag per tool endpoint. Tool requests send If-None-Match,
+// and a 304 reuses the stored result instead of re-downloading it.
+const toolResults = {};
+
+/**
+ * POST to a tool endpoint with ETag revalidation
+ * @param {string} path
+ * @param {(response: Response) => Promise<any>} readBody
+ * @param {string} failMessage
+ */
+async function runTool(path, readBody, failMessage) {
+  const cached = toolResults[path];
+  const response = await fetch(`${BASE_URL}${path}`, {
+    method: 'POST',
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+  });
+
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+
+  if (!response.ok) {
+    const err = await response.json().catch(() => ({}));
+    throw new Error(err.detail || `${failMessage} (${response.status})`);
+  }
+
+  const data = await readBody(response);
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    toolResults[path] = { etag, data };
+  } else {
+    delete toolResults[path];
+  }
+  return data;
+}
+
 /**
  * Upload files to the backend
  * @param {FileList|File[]} files
@@ -43,30 +79,43 @@ export async function getUploadedFiles() {
  * @returns {Promise<Blob>}
  */
 export async function runFinancialExtraction() {
-  const response = await fetch(`${BASE_URL}/tools/financial-extraction`, {
-    method: 'POST',
-  });
-
-  if (!response.ok) {
-    const err = await response.json().catch(() => ({}));
-    throw new Error(err.detail || `Extraction failed (${response.status})`);
-  }
-
-  return response.blob();
+  return runTool('/tools/financial-extraction', (response) => response.blob(), 'Extraction failed');
 }
 
 /**
  * Run Earnings Summary tool
+ * @param {'llm'|'extractive'} mode - 'extractive' is a fast local preview without LLM calls
  * @returns {Promise<Object>} Structured JSON summary
  */
-export async function runEarningsSummary() {
-  const response = await fetch(`${BASE_URL}/tools/earnings-summary`, {
+export async function runEarningsSummary(mode = 'llm') {
+  return runTool(`/tools/earnings-summary?mode=${mode}`, (response) => response.json(), 'Summary failed');
+}
+
+/**
+ * Run Earnings Comparison tool (quarter-over-quarter view)
+ * @param {'llm'|'extractive'} mode - defaults to the fast local 'extractive' mode
+ * @returns {Promise<Object>} Per-quarter summaries and changes between them
+ */
+export async function runEarningsComparison(mode = 'extractive') {
+  return runTool(`/tools/earnings-comparison?mode=${mode}`, (response) => response.json(), 'Comparison failed');
+}
+
+/**
+ * Ask a question about the uploaded documents
+ * @param {string} question
+ * @param {number} topK - number of passages sent to the LLM
+ * @returns {Promise<{ question: string, answer: string, sources: Array }>}
+ */
+export async function askQuestion(question, topK = 5) {
+  const response = await fetch(`${BASE_URL}/tools/ask`, {
     method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ question, top_k: topK }),
   });
 
   if (!response.ok) {
     const err = await response.json().catch(() => ({}));
-    throw new Error(err.detail || `Summary failed (${response.status})`);
+    throw new Error(err.detail || `Question failed (${response.status})`);
   }
 
   return response.json();